@@ -0,0 +1,113 @@
+"""Runs many headless boss fights across a process pool to tune boss difficulty.
+
+Every combination of the given boss settings is played `--fights` times, each fight in its own world
+with its own seed, and the results are aggregated per configuration:
+
+    python batch_sim.py --max-health 300 600 --phase-health 300,100 200,50 --cooldowns 10,60,45 --fights 200
+
+The boss itself only rolls dice from phase 2 on (its teleports), so phase 1 plays out the same for a given
+player input. Both policies are therefore seeded: fights of one configuration differ because the player
+does, and only start to differ on the boss's side once a fight reaches phase 2.
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import main_angelo as game
+
+game.init_display(headless=True)
+
+def keep_in_arena(world, controls):
+    """Wall-jumping up the screen edge takes the player out of the arena, where nothing can reach it and a
+    fight only ends by timing out. Above the screen, stop jumping and steer back towards the middle."""
+    player = world.player
+    if player.rect.top >= 0: return controls
+    left = player.rect.centerx > game.SCREEN_WIDTH // 2
+    return controls._replace(left=left, right=not left, jump=False, dash=False)
+
+class RandomPolicy:
+    """Mashes random inputs, re-rolled every few frames; seeded so a fight can be replayed."""
+    def __init__(self, seed, hold=8):
+        self.rng, self.hold, self.controls = random.Random(f'{seed}:policy'), hold, game.NO_CONTROLS
+
+    def __call__(self, world, frame):
+        if frame % self.hold == 0:
+            self.controls = game.Controls(*(self.rng.random() < 0.5 for _ in game.Controls._fields))
+        return keep_in_arena(world, self.controls)
+
+class ScriptedPolicy:
+    """game.scripted_policy with its jump/attack timing shifted by a seeded random offset every couple of seconds."""
+    def __init__(self, seed, every=120):
+        self.rng, self.every, self.offset = random.Random(f'{seed}:policy'), every, 0
+
+    def __call__(self, world, frame):
+        if frame % self.every == 0: self.offset = self.rng.randrange(40)
+        return keep_in_arena(world, game.scripted_policy(world, frame + self.offset))
+
+def make_policy(name, seed):
+    return ScriptedPolicy(seed) if name == 'scripted' else RandomPolicy(seed)
+
+def play(task):
+    """One fight in a fresh world. Runs inside a worker process."""
+    config, seed, policy, max_frames = task
+    result, = game.run_headless(1, max_frames, make_policy(policy, seed), game.World(seed, config))
+    return config, result
+
+def summarize(config, results):
+    wins = [r for r in results if r['result'] == 'win']
+    mean = lambda values: round(sum(values) / len(values), 2) if values else None
+    return {'config': config._asdict(), 'fights': len(results),
+            'win_rate': round(len(wins) / len(results), 4),
+            'mean_time_to_kill_s': mean([r['frames'] / game.SIM_HZ for r in wins]),
+            'mean_masks_lost': mean([r['masks_lost'] for r in results]),
+            'mean_boss_health_left': mean([r['boss_health'] for r in results]),
+            'timeouts': sum(r['result'] == 'timeout' for r in results)}
+
+def run_batch(configs, fights, policy='scripted', seed=0, workers=None, max_frames=60 * 60 * 5):
+    """Plays `fights` fights per config on a process pool. Fight i of every config uses seed + i."""
+    tasks = [(config, seed + i, policy, max_frames) for config in configs for i in range(fights)]
+    by_config = {config: [] for config in configs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        for config, result in pool.map(play, tasks, chunksize=chunk):
+            by_config[config].append(result)
+    return [summarize(config, results) for config, results in by_config.items()]
+
+def int_tuple(text):
+    return tuple(int(v) for v in text.split(','))
+
+def main():
+    defaults = game.BossConfig()
+    parser = argparse.ArgumentParser(description='Batch boss fight simulator')
+    parser.add_argument('--max-health', type=int, nargs='+', default=[defaults.max_health])
+    parser.add_argument('--phase-health', type=int_tuple, nargs='+', default=[(defaults.phase2_health, defaults.phase3_health)],
+                        metavar='P2,P3', help='boss health at which phase 2 and phase 3 start')
+    parser.add_argument('--cooldowns', type=int_tuple, nargs='+', default=[defaults.attack_cooldowns],
+                        metavar='C1,C2,C3', help='attack cooldown (frames) in phases 1, 2 and 3')
+    parser.add_argument('--fights', type=int, default=100, help='fights per configuration')
+    parser.add_argument('--policy', choices=['scripted', 'random'], default='scripted')
+    parser.add_argument('--seed', type=int, default=0, help='fight i of each configuration uses seed + i')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--max-frames', type=int, default=60 * 60 * 5, help='a fight lasting longer is a timeout')
+    parser.add_argument('--output', metavar='PATH', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    configs = [game.BossConfig(health, p2, p3, cooldowns) for health, (p2, p3), cooldowns
+               in itertools.product(args.max_health, args.phase_health, args.cooldowns)]
+    start = time.perf_counter()
+    summaries = run_batch(configs, args.fights, args.policy, args.seed, args.workers, args.max_frames)
+    elapsed = time.perf_counter() - start
+    text = json.dumps({'policy': args.policy, 'seed': args.seed, 'seconds': round(elapsed, 2), 'results': summaries}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+    else:
+        print(text)
+    print(f"{len(configs) * args.fights} fights in {elapsed:.2f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
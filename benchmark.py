@@ -0,0 +1,129 @@
+"""Frame-time benchmark for main_angelo.py.
+
+Runs scripted scenarios (menu, enemy chase, each boss phase) for a fixed number of frames with the
+dummy video driver and prints mean/p95/p99 update and render times per scenario as JSON.
+Render times include the display flip in every scenario. The menu has no simulation step, so its update
+time is only loop overhead; its render time is a full redraw of the title screen.
+
+    python benchmark.py --frames 600 --output bench.json
+"""
+import sys
+import time
+import json
+import random
+import argparse
+
+import main_angelo as game
+
+game.init_display(headless=True)
+
+WARMUP_FRAMES = 120  # covers the boss intro, so measuring starts with the fight itself
+
+def keep_alive(world):
+    # The player soaks every hit so a scenario never ends in a restart
+    world.player.current_masks = world.player.max_masks
+
+def enter_phase(boss, phase):
+    # Damage the boss through its own take_damage so the phase switch spawns clones / enables rage
+    for health in {2: [250], 3: [250, 90]}.get(phase, []):
+        if boss.health > health:
+            boss.damage_cooldown = 0
+            boss.take_damage(boss.health - health)
+
+def chase_policy(world, frame):
+    # Stand still inside the enemy's detection range; it keeps chasing and jumping at the player
+    return game.NO_CONTROLS
+
+def boss_policy(world, frame):
+    return game.scripted_policy(world, frame)._replace(attack=False)
+
+def setup_menu(world):
+    game.main_menu.invalidate()
+
+def draw_menu():
+    # The menu normally draws once and then idles; redraw it every frame so its cost is measured
+    game.main_menu.invalidate()
+    game.main_menu.draw(game.screen)
+
+def setup_chase(world):
+    world.restart()
+    world.player.rect.centerx = world.enemy1.rect.centerx - 150
+
+def setup_boss(phase):
+    def setup(world):
+        world.start_boss_fight()
+        enter_phase(world.boss, phase)
+    return setup
+
+def phase2_tick(world, frame, rng):
+    if not world.boss.clones: world.boss.spawn_clones()
+
+def phase3_tick(world, frame, rng):
+    # Worst case: the spiral plus constant particle bursts keeping the pool saturated.
+    # Placed with the benchmark's own rng so the boss's gameplay stream is left alone
+    if frame % 10 == 0:
+        for _ in range(4):
+            world.create_particles(rng.randint(0, game.SCREEN_WIDTH), rng.randint(0, game.SCREEN_HEIGHT), game.WHITE, 50)
+
+SCENARIOS = {
+    # name: (setup, policy, per-frame hook(world, frame, rng))
+    'menu': (setup_menu, None, None),
+    'enemy1_chase': (setup_chase, chase_policy, None),
+    'boss_phase1': (setup_boss(1), boss_policy, None),
+    'boss_phase2': (setup_boss(2), boss_policy, phase2_tick),
+    'boss_phase3': (setup_boss(3), boss_policy, phase3_tick),
+}
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+def summarize(times):
+    ms = sorted(t * 1000 for t in times)
+    return {'mean': round(sum(ms) / len(ms), 4), 'p95': round(percentile(ms, 0.95), 4),
+            'p99': round(percentile(ms, 0.99), 4), 'max': round(ms[-1], 4)}
+
+def run_scenario(name, frames, seed):
+    setup, policy, hook = SCENARIOS[name]
+    world, rng = game.World(seed), random.Random(f'{seed}:benchmark')
+    setup(world)
+    update_times, render_times = [], []
+    for frame in range(WARMUP_FRAMES + frames):
+        start = time.perf_counter()
+        if policy:
+            keep_alive(world)
+            if hook: hook(world, frame, rng)
+            world.step(policy(world, frame))
+        mid = time.perf_counter()
+        if policy: world.render(game.screen)
+        else: draw_menu()
+        game.pygame.display.flip()
+        end = time.perf_counter()
+        if frame >= WARMUP_FRAMES:
+            update_times.append(mid - start)
+            render_times.append(end - mid)
+    result = {'frames': frames, 'update_ms': summarize(update_times), 'render_ms': summarize(render_times)}
+    if policy:
+        boss = world.boss
+        result.update(particles=len(world.particles), projectiles=world.projectiles.n,
+                      boss_phase=boss.phase if boss else None, clones=len(boss.clones) if boss else 0)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Poxel Knight frame-time benchmark')
+    parser.add_argument('--frames', type=int, default=600, help='measured frames per scenario (after warm-up)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='run only these (repeatable)')
+    parser.add_argument('--output', metavar='PATH', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = {'python': sys.version.split()[0], 'pygame': game.pygame.version.ver, 'seed': args.seed,
+              'scenarios': {name: run_scenario(name, args.frames, args.seed) for name in args.scenario or SCENARIOS}}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+    else:
+        print(text)
+    game.pygame.quit()
+
+if __name__ == '__main__':
+    main()
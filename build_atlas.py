@@ -0,0 +1,69 @@
+"""Packs every animation frame, already scaled to the size the game draws it at, into one atlas image.
+
+    python build_atlas.py
+
+Writes img/atlas.png and its index img/atlas.json. main_angelo.py slices frames out of the atlas at
+startup instead of decoding and scaling each PNG. Any frame missing from it (other scale, new file) or
+whose PNG changed after the atlas was built is still loaded from its own file, so a stale atlas only
+costs the speed-up, never correctness.
+"""
+import os
+import json
+import argparse
+import pygame
+
+# Folder -> scale it is loaded at; must match the load_animations / load_img calls in main_angelo.py.
+# The most specific folder wins (the masks live inside img/player but are drawn at MASK_SCALE).
+ATLAS_SOURCES = {'img/player': 3, 'img/player/Mask': 2, 'img/enemy': 2, 'img/boss': 0.5}
+ATLAS_IMAGE, ATLAS_INDEX = 'img/atlas.png', 'img/atlas.json'
+MAX_WIDTH, PADDING = 1200, 1
+
+def find_frames(sources):
+    """[(path, scale)] for every PNG under the source folders."""
+    frames = []
+    for top in sources:
+        for root, _, files in os.walk(top):
+            for f in files:
+                path = os.path.join(root, f).replace(os.sep, '/')
+                owner = max((s for s in sources if path.startswith(s + '/')), key=len)
+                if f.endswith('.png') and owner == top: frames.append((path, sources[top]))
+    return sorted(frames)
+
+def scaled(img, scale):
+    # Same transform load_img applies at runtime, so atlas frames are pixel-identical
+    return pygame.transform.scale(img, (int(img.get_width() * scale), int(img.get_height() * scale)))
+
+def pack(sizes, max_width):
+    """Shelf packing, tallest first. sizes: {key: (w, h)}. Returns ({key: (x, y)}, atlas width, atlas height)."""
+    x = y = shelf_h = width = 0
+    placed = {}
+    for key, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x and x + w > max_width:
+            x, y, shelf_h = 0, y + shelf_h + PADDING, 0
+        placed[key] = (x, y)
+        x += w + PADDING
+        shelf_h, width = max(shelf_h, h), max(width, x - PADDING)
+    return placed, width, y + shelf_h
+
+def build(sources=ATLAS_SOURCES, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, max_width=MAX_WIDTH):
+    images = {(path, scale): scaled(pygame.image.load(path), scale) for path, scale in find_frames(sources)}
+    placed, width, height = pack({key: img.get_size() for key, img in images.items()}, max_width)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    frames = []
+    for (path, scale), (x, y) in sorted(placed.items()):
+        img = images[(path, scale)]
+        atlas.blit(img, (x, y))
+        frames.append([path, scale, x, y, img.get_width(), img.get_height(), os.path.getmtime(path)])
+    pygame.image.save(atlas, image_path)
+    with open(index_path, 'w') as f:
+        json.dump({'version': 1, 'image': os.path.basename(image_path), 'frames': frames}, f, indent=1)
+    return len(frames), width, height
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the sprite atlas for Poxel Knight')
+    parser.add_argument('--max-width', type=int, default=MAX_WIDTH)
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    count, width, height = build(max_width=args.max_width)
+    print(f"packed {count} frames into {ATLAS_IMAGE} ({width}x{height}), index {ATLAS_INDEX}")
@@ -0,0 +1,113 @@
+"""Gym-style environments around the headless game, for training and evaluating agents.
+
+    env = PoxelEnv(mode='boss', seed=0)
+    obs = env.reset()
+    obs, reward, done, info = env.step(action)   # action: int bitmask of Controls fields (0..127)
+
+VecPoxelEnv steps N worlds in lockstep and returns stacked NumPy arrays; finished worlds reset themselves.
+Nothing is rendered, so stepping costs only the simulation.
+"""
+import numpy as np
+import main_angelo as game
+
+game.init_display(headless=True)
+
+N_ACTIONS = len(game.CONTROLS_BY_BITS)  # every combination of left/right/jump/up/down/attack/dash
+N_PROJECTILES = 8  # nearest projectiles included in the observation
+OBS_SIZE = 11 + 4 + 6 + N_PROJECTILES * 4
+
+def observe(world):
+    """Fixed-size float32 view of the world, positions relative to the player and scaled to roughly -1..1."""
+    W, H = game.SCREEN_WIDTH, game.SCREEN_HEIGHT
+    player, enemy1, boss, proj = world.player, world.enemy1, world.boss, world.projectiles
+    px, py = player.rect.centerx, player.rect.centery
+    obs = np.zeros(OBS_SIZE, np.float32)
+    obs[:11] = (px / W, py / H, player.vel_y / 20, player.direction, player.in_air, player.dashing, player.attacking,
+                player.wall_sliding, player.current_masks / player.max_masks, player.dash_cooldown > 0, player.attack_cooldown > 0)
+    if enemy1.alive and not world.boss_fight_active:
+        obs[11:15] = (1, (enemy1.rect.centerx - px) / W, (enemy1.rect.centery - py) / H, enemy1.health / enemy1.max_health)
+    if boss and boss.alive:
+        obs[15:21] = (1, (boss.rect.centerx - px) / W, (boss.rect.centery - py) / H, boss.health / boss.max_health,
+                      boss.phase / 3, len(boss.clones) / 3)
+    if proj.n:
+        dx, dy = (proj.x[:proj.n] - px) / W, (proj.y[:proj.n] - py) / H
+        nearest = np.argsort(dx * dx + dy * dy)[:N_PROJECTILES]
+        k = len(nearest)
+        obs[21:21 + k * 4] = np.stack([dx[nearest], dy[nearest], proj.vel_x[nearest] / 10, proj.vel_y[nearest] / 10], 1).ravel()
+    return obs
+
+class PoxelEnv:
+    """One world. mode 'enemy' starts in the first room against Enemy1, 'boss' starts in the boss arena.
+
+    Reward: damage dealt (as a fraction of the target's max health) minus 0.2 per mask lost, +1 for a kill,
+    -1 for dying. An episode ends on a kill, a death or after max_steps agent steps.
+    """
+    def __init__(self, mode='boss', seed=None, frame_skip=1, max_steps=60 * 60 * 3, boss_config=game.BossConfig()):
+        assert mode in ('enemy', 'boss')
+        self.mode, self.frame_skip, self.max_steps = mode, frame_skip, max_steps
+        self.world = game.World(seed, boss_config)
+        self.steps = 0
+
+    def reset(self, seed=None):
+        if seed is not None: self.world.reseed(seed)
+        if self.mode == 'boss': self.world.start_boss_fight()
+        else: self.world.restart(full=True)  # a fresh Enemy1 even if the last episode killed it
+        self.steps = 0
+        return observe(self.world)
+
+    def target(self):
+        return self.world.boss if self.mode == 'boss' else self.world.enemy1
+
+    def step(self, action):
+        world, controls = self.world, game.CONTROLS_BY_BITS[int(action)]
+        reward, done, outcome = 0.0, False, None
+        for _ in range(self.frame_skip):
+            target, masks = self.target(), world.player.current_masks
+            health = target.health
+            if not world.step(controls):
+                reward, done, outcome = reward - 0.2 * masks - 1.0, True, 'loss'
+                break
+            reward += (health - target.health) / target.max_health - 0.2 * (masks - world.player.current_masks)
+            if not target.alive:
+                reward, done, outcome = reward + 1.0, True, 'win'
+                break
+        self.steps += 1
+        if not done and self.steps >= self.max_steps:
+            done, outcome = True, 'timeout'
+        return observe(world), reward, done, {'outcome': outcome, 'tick': world.tick}
+
+class VecPoxelEnv:
+    """n PoxelEnvs stepped in lockstep. Env i is seeded with seed + i; an env that finishes resets
+    immediately and its last observation is kept in info['final_observation'].
+    """
+    def __init__(self, n, mode='boss', seed=0, **kwargs):
+        self.envs = [PoxelEnv(mode, seed + i, **kwargs) for i in range(n)]
+        self.obs = np.zeros((n, OBS_SIZE), np.float32)
+        self.rewards, self.dones = np.zeros(n, np.float32), np.zeros(n, bool)
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            self.obs[i] = env.reset()
+        return self.obs.copy()
+
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, self.rewards[i], self.dones[i], info = env.step(action)
+            if self.dones[i]:
+                info['final_observation'] = obs
+                obs = env.reset()
+            self.obs[i] = obs
+            infos.append(info)
+        return self.obs.copy(), self.rewards.copy(), self.dones.copy(), infos
+
+if __name__ == '__main__':
+    import time
+    vec, rng = VecPoxelEnv(16, 'boss'), np.random.default_rng(0)
+    vec.reset()
+    start, steps, episodes = time.perf_counter(), 2000, 0
+    for _ in range(steps):
+        _, _, dones, _ = vec.step(rng.integers(0, N_ACTIONS, len(vec.envs)))
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{steps * len(vec.envs)} env steps in {elapsed:.2f}s ({steps * len(vec.envs) / elapsed:.0f} steps/s), {episodes} episodes")
@@ -1,18 +1,31 @@
 import pygame
 import os
+import time
 import random
 import math
-
-pygame.init()
+import argparse
+import struct
+import csv
+import json
+import pickle
+import io
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple, deque
+import numpy as np
 
 # ---------- CONFIG ----------
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 800
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('Poxxel')
+screen = None  # opened by init_display()
 FPS, clock = 60, pygame.time.Clock()
+# The simulation always advances in fixed 60 Hz steps; FPS (--fps) only sets how often we render
+SIM_HZ = 60
+STEP_MS = 1000 / SIM_HZ
+MAX_FRAME_MS = 250  # a longer hitch is dropped instead of replayed as a burst of steps
 
 # ---------- GAME VARIABLES ----------
 GRAVITY = 0.75
+TILE_SIZE = 25  # collision tile; room platforms lie on this grid
 DASH_SPEED, DASH_TIME, DASH_COOLDOWN = 14, 12, 40
 JUMP_SPEED, MAX_JUMP_TIME, JUMP_HOLD_FORCE = -11, 15, -0.5
 ATTACK_RANGE, ATTACK_WIDTH, ATTACK_HEIGHT, ATTACK_DAMAGE = 60, 40, 50, 10
@@ -23,148 +36,344 @@ WHITE, ORANGE, WHITE = (255, 215, 0), (255, 165, 0), (255, 255, 255)
 
 
 enemy1_JUMP_CHANCE = 0.03
-static_background = None
-roof_restored = False
-moving_left = moving_right = DEBUG_HITBOXES = waiting_for_reentry = False
-middle_platforms_visible = True
-waiting_for_reentry_counter = 0
-vertical_platforms = []
-vertical_platforms_active = False
-enemy1_dead_handled = boss_env_suppressed = False
-boss_fight_active = False
-boss = None
-
-# Load and convert background
-try:
-    Back = pygame.image.load('img/BG/New_BG.png')
-    Back = pygame.transform.scale(Back, (SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
-except:
-    Back = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    Back.fill(BG).convert()
-
-# Load well images
-def load_img(path, size=None, alpha=True):
+moving_left = moving_right = DEBUG_HITBOXES = False
+DIRTY_RECTS = False  # F1 toggles between dirty-rect updates and full redraws
+
+def lerp_offset(prev, cur, interp):
+    """Pixel offset that draws a sprite interp of the way from its previous step position to its current one."""
+    dx, dy = prev[0] - cur[0], prev[1] - cur[1]
+    if abs(dx) > 100 or abs(dy) > 100: return 0, 0  # teleports (well, restart) snap instead of sliding
+    return round(dx * (1 - interp)), round(dy * (1 - interp))
+
+# ---------- ASSETS ----------
+# Every image is loaded, scaled and converted once per process and the surface is shared by
+# whoever asks for it again (restart, new Boss, new Player...). Keys are (path, size, alpha).
+assets = {}
+
+# Asset and room paths are relative to the game, not to wherever it was started or imported from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def asset_path(path):
+    return os.path.join(BASE_DIR, path)
+
+def load_atlas(index_path='img/atlas.json'):
+    """Pre-scaled frames packed by build_atlas.py as {(path, scale): subsurface}; empty if no atlas was built.
+
+    A frame whose PNG changed after the atlas was built is left out, so load_img reads the file instead.
+    load_img takes each frame out of the dict the first time it is asked for.
+    """
     try:
-        img = pygame.image.load(path)
-        if size: img = pygame.transform.scale(img, size)
-        return img.convert_alpha() if alpha else img.convert()
+        with open(asset_path(index_path)) as f: index = json.load(f)
+        sheet = pygame.image.load(asset_path(os.path.join(os.path.dirname(index_path), index['image']))).convert_alpha()
     except:
-        return None
+        return {}
+    frames = {}
+    for path, scale, x, y, w, h, mtime in index['frames']:
+        try: stale = os.path.getmtime(asset_path(path)) != mtime
+        except OSError: stale = False
+        if not stale: frames[(path, scale)] = sheet.subsurface((x, y, w, h))
+    return frames
 
-well_img = load_img('img/BG/well1.png', (WELL_WIDTH, WELL_HEIGHT))
-well2_img = load_img('img/BG/well2.png', (WELL_WIDTH, WELL_HEIGHT))
+atlas = {}  # filled by init_display(); slicing the sheet needs a display to convert to
+
+# (path, size) -> surface decoded and scaled by the room loader thread, waiting for load_img to convert it
+prefetched = {}
+
+def decode_img(path, size=None):
+    img = pygame.image.load(asset_path(path))
+    if isinstance(size, tuple): img = pygame.transform.scale(img, size)
+    elif size: img = pygame.transform.scale(img, (int(img.get_width() * size), int(img.get_height() * size)))
+    return img
+
+def load_img(path, size=None, alpha=True):
+    """size is either a (w, h) tuple or a scale factor; returns None if the file can't be loaded."""
+    key = (path, size, alpha)
+    if key not in assets:
+        try:
+            if (path, size) in atlas:
+                # Already scaled and converted by load_atlas: keep the subsurface so frames are drawn
+                # straight from the one sheet (converting would copy them out of it)
+                img = atlas.pop((path, size))
+                assets[key] = img if alpha else img.convert()
+            else:
+                img = prefetched.pop((path, size), None) or decode_img(path, size)
+                assets[key] = img.convert_alpha() if alpha else img.convert()
+        except:
+            assets[key] = None
+    return assets[key]
 
-# Load health masks
+# Well and health mask images, loaded by init_display()
 MASK_SCALE = 2
-mask_filled = load_img('img/player/Mask/mask_filled.png')
-mask_empty = load_img('img/player/Mask/mask_empty.png')
-if mask_filled:
-    mask_filled = pygame.transform.scale(mask_filled, (int(mask_filled.get_width() * MASK_SCALE), int(mask_filled.get_height() * MASK_SCALE))).convert_alpha()
-    mask_empty = pygame.transform.scale(mask_empty, (int(mask_empty.get_width() * MASK_SCALE), int(mask_empty.get_height() * MASK_SCALE))).convert_alpha()
-else:
-    mask_filled = pygame.Surface((30, 30))
-    mask_filled.fill(GREEN).convert()
-    mask_empty = pygame.Surface((30, 30))
-    mask_empty.fill(RED).convert()
-
-def draw_health_masks(current_masks, max_masks=5):
-    for i in range(max_masks):
-        x = 20 + i * (mask_filled.get_width() + 10)
-        screen.blit(mask_filled if i < current_masks else mask_empty, (x, 20))
+well_img = well2_img = mask_filled = mask_empty = None
+
+def load_ui_images():
+    global well_img, well2_img, mask_filled, mask_empty
+    well_img = load_img('img/BG/well1.png', (WELL_WIDTH, WELL_HEIGHT))
+    well2_img = load_img('img/BG/well2.png', (WELL_WIDTH, WELL_HEIGHT))
+    mask_filled = load_img('img/player/Mask/mask_filled.png', MASK_SCALE)
+    mask_empty = load_img('img/player/Mask/mask_empty.png', MASK_SCALE)
+    if not mask_filled:
+        mask_filled = pygame.Surface((30, 30)).convert()
+        mask_filled.fill(GREEN)
+        mask_empty = pygame.Surface((30, 30)).convert()
+        mask_empty.fill(RED)
+
+# ---------- SURFACE CACHE ----------
+class SurfaceCache:
+    """Builds each surface once per key and hands back the same object afterwards."""
+    def __init__(self, build):
+        self.build, self.surfaces = build, {}
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        surf = self.surfaces.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.surfaces[key] = self.build(*key)
+        else:
+            self.hits += 1
+        return surf
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.surfaces)}
+
+class Palette:
+    """Maps RGB tuples to small ids so pools can keep colors in an integer column."""
+    def __init__(self):
+        self.colors, self.ids = [], {}
+
+    def id(self, color):
+        color = tuple(color)
+        if color not in self.ids:
+            self.ids[color] = len(self.colors)
+            self.colors.append(color)
+        return self.ids[color]
 
 # ---------- PARTICLE EFFECTS ----------
-class Particle:
-    def __init__(self, x, y, color, vel_x, vel_y, life):
-        self.x, self.y = x, y
-        self.color = color
-        self.vel_x, self.vel_y = vel_x, vel_y
-        self.life = life
-        self.max_life = life
-        self.size = random.randint(3, 8)
-    
+ALPHA_LEVELS = 16  # Particle fade is drawn with this many alpha steps
+
+def build_particle_sprite(color, size, alpha):
+    s = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+    pygame.draw.circle(s, (*color, alpha), (size, size), size)
+    return s
+
+particle_sprites = SurfaceCache(build_particle_sprite)
+
+class ParticlePool:
+    """Fixed-size particle store: one NumPy column per attribute, dead slots get recycled."""
+    def __init__(self, capacity=512, rng=None):
+        self.capacity = capacity
+        self.rng = rng or np.random.default_rng()  # cosmetic only, kept apart from gameplay randomness
+        self.x, self.y = np.zeros(capacity), np.zeros(capacity)
+        self.vel_x, self.vel_y = np.zeros(capacity), np.zeros(capacity)
+        self.life, self.max_life = np.zeros(capacity, np.int32), np.ones(capacity, np.int32)
+        self.size = np.zeros(capacity, np.int32)
+        self.color_id = np.zeros(capacity, np.int16)
+        self.palette = Palette()
+
+    def __len__(self):
+        return int(np.count_nonzero(self.life > 0))
+
+    def emit(self, x, y, color, count):
+        count = min(count, self.capacity)
+        idx = np.flatnonzero(self.life <= 0)[:count]
+        if len(idx) < count:  # Pool is full: recycle the sparks closest to dying
+            idx = np.argpartition(self.life, count - 1)[:count]
+        n = len(idx)
+        self.x[idx], self.y[idx] = x, y
+        rng = self.rng
+        self.vel_x[idx] = rng.uniform(-3, 3, n)
+        self.vel_y[idx] = rng.uniform(-5, -1, n)
+        self.life[idx] = self.max_life[idx] = rng.integers(20, 41, n)
+        self.size[idx] = rng.integers(3, 9, n)
+        self.color_id[idx] = self.palette.id(color)
+
     def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.vel_y += 0.3
-        self.life -= 1
-        return self.life > 0
-    
-    def draw(self):
-        alpha = int(255 * (self.life / self.max_life))
-        s = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        color_with_alpha = (*self.color, alpha)
-        pygame.draw.circle(s, color_with_alpha, (self.size, self.size), self.size)
-        screen.blit(s, (int(self.x - self.size), int(self.y - self.size)))
-
-particles = []
-
-def create_particles(x, y, color, count=15):
-    for _ in range(count):
-        vel_x = random.uniform(-3, 3)
-        vel_y = random.uniform(-5, -1)
-        particles.append(Particle(x, y, color, vel_x, vel_y, random.randint(20, 40)))
-
-# ---------- PROJECTILE CLASS ----------
-class Projectile:
-    def __init__(self, x, y, target_x, target_y, speed, color, size=10):
-        self.x, self.y = x, y
+        live = self.life > 0
+        self.x[live] += self.vel_x[live]
+        self.y[live] += self.vel_y[live]
+        self.vel_y[live] += 0.3
+        self.life[live] -= 1
+
+    def clear(self):
+        self.life[:] = 0
+
+    def columns(self):
+        return self.x, self.y, self.vel_x, self.vel_y, self.life, self.max_life, self.size, self.color_id
+
+    def get_state(self):
+        # Slots past the last live one are dead, so only the used prefix is kept (slot order matters to emit)
+        live = np.flatnonzero(self.life > 0)
+        k = int(live[-1]) + 1 if len(live) else 0
+        return [col[:k].copy() for col in self.columns()], list(self.palette.colors), self.rng.bit_generator.state
+
+    def set_state(self, state):
+        columns, colors, self.rng.bit_generator.state = state
+        k = len(columns[4])
+        for col, saved in zip(self.columns(), columns):
+            col[:k] = saved
+        self.life[k:] = 0
+        self.palette.colors, self.palette.ids = list(colors), {c: i for i, c in enumerate(colors)}
+
+    def draw(self, surface, interp=1.0):
+        idx = np.flatnonzero(self.life > 0)
+        if not len(idx): return []
+        size = self.size[idx]
+        step = 255 // (ALPHA_LEVELS - 1)
+        alpha = (255 * self.life[idx] // self.max_life[idx]) * (ALPHA_LEVELS - 1) // 255 * step
+        back = 1 - interp  # the last step moved each particle by its velocity before gravity was added
+        xs = (self.x[idx] - self.vel_x[idx] * back - size).astype(int)
+        ys = (self.y[idx] - (self.vel_y[idx] - 0.3) * back - size).astype(int)
+        palette, get = self.palette.colors, particle_sprites.get
+        return surface.blits([(get((palette[c], sz, a)), (x, y)) for c, sz, a, x, y in
+                             zip(self.color_id[idx].tolist(), size.tolist(), alpha.tolist(), xs.tolist(), ys.tolist())])
+
+# ---------- PROJECTILES ----------
+class ProjectilePool:
+    """All live boss projectiles as NumPy columns; update, culling and player hits are one vectorized pass."""
+    def __init__(self, capacity=256):
+        self.n = 0
+        self.x, self.y = np.zeros(capacity), np.zeros(capacity)
+        self.vel_x, self.vel_y = np.zeros(capacity), np.zeros(capacity)
+        self.size = np.zeros(capacity, np.int32)
+        self.color_id = np.zeros(capacity, np.int16)
+        self.palette = Palette()
+
+    def __len__(self):
+        return self.n
+
+    def columns(self):
+        return self.x, self.y, self.vel_x, self.vel_y, self.size, self.color_id
+
+    def fire(self, x, y, target_x, target_y, speed, color, size=10):
+        if self.n == len(self.x):
+            self.x, self.y, self.vel_x, self.vel_y, self.size, self.color_id = [np.resize(c, len(c) * 2) for c in self.columns()]
         angle = math.atan2(target_y - y, target_x - x)
-        self.vel_x = math.cos(angle) * speed
-        self.vel_y = math.sin(angle) * speed
-        self.color = color
-        self.size = size
-        self.rect = pygame.Rect(x - size//2, y - size//2, size, size)
-    
-    def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.rect.center = (int(self.x), int(self.y))
-        return 0 <= self.x <= SCREEN_WIDTH and 0 <= self.y <= SCREEN_HEIGHT
-    
-    def draw(self):
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
-        # Glow effect
-        s = pygame.Surface((self.size * 4, self.size * 4), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*self.color, 100), (self.size * 2, self.size * 2), self.size * 2)
-        screen.blit(s, (int(self.x - self.size * 2), int(self.y - self.size * 2)))
+        i = self.n
+        self.x[i], self.y[i] = x, y
+        self.vel_x[i], self.vel_y[i] = math.cos(angle) * speed, math.sin(angle) * speed
+        self.size[i], self.color_id[i] = size, self.palette.id(color)
+        self.n += 1
+
+    def update(self, target_rect=None):
+        """Advance every projectile, drop off-screen ones and those touching target_rect.
+
+        Returns (x, y, color) for each projectile that hit the target.
+        """
+        n = self.n
+        if not n: return []
+        x, y = self.x[:n], self.y[:n]
+        x += self.vel_x[:n]
+        y += self.vel_y[:n]
+        keep = (x >= 0) & (x <= SCREEN_WIDTH) & (y >= 0) & (y <= SCREEN_HEIGHT)
+        hits = []
+        if target_rect is not None:
+            # Same test as Rect.colliderect on a size x size rect centred on the truncated position
+            size = self.size[:n]
+            left, top = x.astype(np.int32) - size // 2, y.astype(np.int32) - size // 2
+            hit = keep & (left < target_rect.right) & (left + size > target_rect.left) & (top < target_rect.bottom) & (top + size > target_rect.top)
+            if hit.any():
+                colors = self.palette.colors
+                hits = [(hx, hy, colors[c]) for hx, hy, c in zip(x[hit].tolist(), y[hit].tolist(), self.color_id[:n][hit].tolist())]
+                keep &= ~hit
+        k = int(np.count_nonzero(keep))
+        if k < n:
+            for col in self.columns():
+                col[:k] = col[:n][keep]
+            self.n = k
+        return hits
+
+    def clear(self):
+        self.n = 0
+
+    def get_state(self):
+        return [col[:self.n].copy() for col in self.columns()], list(self.palette.colors)
+
+    def set_state(self, state):
+        columns, colors = state
+        self.n = len(columns[0])
+        if self.n > len(self.x):
+            self.x, self.y, self.vel_x, self.vel_y, self.size, self.color_id = [np.resize(c, self.n) for c in self.columns()]
+        for col, saved in zip(self.columns(), columns):
+            col[:self.n] = saved
+        self.palette.colors, self.palette.ids = list(colors), {c: i for i, c in enumerate(colors)}
+
+    def draw(self, surface, interp=1.0):
+        n = self.n
+        if not n: return []
+        size, back = self.size[:n], 1 - interp
+        xs = (self.x[:n] - self.vel_x[:n] * back - size * 2).astype(int)
+        ys = (self.y[:n] - self.vel_y[:n] * back - size * 2).astype(int)
+        colors, get = self.palette.colors, projectile_sprites.get
+        return surface.blits([(get((colors[c], sz)), (px, py)) for c, sz, px, py in
+                             zip(self.color_id[:n].tolist(), size.tolist(), xs.tolist(), ys.tolist())])
+
+def build_projectile_sprite(color, size):
+    # Glow first, solid core on top; same look as the old per-frame circle + glow surface
+    s = pygame.Surface((size * 4, size * 4), pygame.SRCALPHA)
+    pygame.draw.circle(s, (*color, 100), (size * 2, size * 2), size * 2)
+    pygame.draw.circle(s, color, (size * 2, size * 2), size)
+    return s
+
+projectile_sprites = SurfaceCache(build_projectile_sprite)
 
 # ---------- BOSS CLASS ----------
+# Difficulty knobs: health, the health at which phases 2 and 3 start, and the attack cooldown of each phase
+BossConfig = namedtuple('BossConfig', 'max_health phase2_health phase3_health attack_cooldowns',
+                        defaults=(600, 300, 100, (10, 60, 45)))
+
+def load_boss_frames(scale):
+    """Returns ({flip: frames}, {flip: flash frames}), built once per scale and shared by every Boss."""
+    key = ('boss', scale)
+    if key in assets: return assets[key]
+    frames = []
+    try:
+        path = 'img/boss/Idle'
+        if os.path.exists(asset_path(path)):
+            num_files = len([f for f in os.listdir(asset_path(path)) if f.endswith('.png')])
+            for i in range(num_files):
+                img = load_img(f'{path}/{i}.png', scale)
+                if img is None: raise FileNotFoundError(f'{path}/{i}.png')
+                frames.append(img)
+                print(f"Loaded boss frame {i}")
+        else:
+            print(f"Boss path not found: {path}")
+    except Exception as e:
+        print(f"Error loading boss animation: {e}")
+    
+    # Fallback if loading fails
+    if not frames:
+        print("Using fallback boss graphics")
+        for _ in range(3):
+            img = pygame.Surface((100, 100), pygame.SRCALPHA)
+            pygame.draw.circle(img, WHITE, (50, 50), 40)
+            frames.append(img)
+    frame_tables = {False: frames, True: flip_frames(frames)}
+    assets[key] = frame_tables, {f: [flash_frame(img) for img in table] for f, table in frame_tables.items()}
+    return assets[key]
+
+def flash_frame(img):
+    flash_img = img.copy()
+    flash_img.fill((255, 255, 255, 200), special_flags=pygame.BLEND_RGB_ADD)
+    return flash_img
+
 class Boss:
-    def __init__(self, x, y):
+    def __init__(self, world, x, y, config=BossConfig()):
+        self.world, self.config = world, config
         self.x, self.y = x, y
-        self.max_health = 600
+        self.max_health = config.max_health
         self.health = self.max_health
         self.alive = True
         self.phase = 1
         
-        # Load boss animation
-        self.animation_frames = []
+        # Load boss animation (both facings and the damage flash are pre-rendered)
         self.scale = 0.5
-        try:
-            path = 'img/boss/Idle'
-            if os.path.exists(path):
-                num_files = len([f for f in os.listdir(path) if f.endswith('.png')])
-                for i in range(num_files):
-                    img = pygame.image.load(f'{path}/{i}.png').convert_alpha()
-                    img = pygame.transform.scale(img, (int(img.get_width() * self.scale), int(img.get_height() * self.scale)))
-                    self.animation_frames.append(img)
-                    print(f"Loaded boss frame {i}")
-            else:
-                print(f"Boss path not found: {path}")
-        except Exception as e:
-            print(f"Error loading boss animation: {e}")
-        
-        # Fallback if loading fails
-        if not self.animation_frames:
-            print("Using fallback boss graphics")
-            for _ in range(3):
-                img = pygame.Surface((100, 100), pygame.SRCALPHA)
-                pygame.draw.circle(img, WHITE, (50, 50), 40)
-                self.animation_frames.append(img)
+        self.frame_tables, self.flash_tables = load_boss_frames(self.scale)
+        self.animation_frames = self.frame_tables[False]
         
         self.frame_index = 0
-        self.animation_speed = 100  # milliseconds per frame
-        self.last_update = pygame.time.get_ticks()
+        self.animation_speed = 6  # simulation ticks per frame
+        self.last_update = world.tick
         self.image = self.animation_frames[self.frame_index]
         self.flip = False
         
@@ -177,7 +386,7 @@ class Boss:
         
         # Combat
         self.attack_timer = 0
-        self.attack_cooldown = 10
+        self.attack_cooldown = config.attack_cooldowns[0]
         self.damage_cooldown = 0
         
         # Phase 2
@@ -188,6 +397,7 @@ class Boss:
         self.rage_mode = False
         
         self.rect = self.image.get_rect(center=(int(x), int(y)))
+        self.prev_pos = self.rect.center
         
         # Intro
         self.intro_mode = True
@@ -197,23 +407,23 @@ class Boss:
         if self.damage_cooldown == 0:
             self.health = max(0, self.health - damage)
             self.damage_cooldown = 10
-            create_particles(self.x, self.y, WHITE, 20)
+            self.world.create_particles(self.x, self.y, WHITE, 20)
             
             # Phase transitions
-            if self.health <= 300 and self.phase == 1:
+            if self.health <= self.config.phase2_health and self.phase == 1:
                 self.phase = 2
                 self.spawn_clones()
-                self.attack_cooldown = 60
-            elif self.health <= 100 and self.phase == 2:
+                self.attack_cooldown = self.config.attack_cooldowns[1]
+            elif self.health <= self.config.phase3_health and self.phase == 2:
                 self.phase = 3
                 self.rage_mode = True
-                self.attack_cooldown = 45
+                self.attack_cooldown = self.config.attack_cooldowns[2]
                 self.clones = []
                 self.clones_active = False
             
             if self.health <= 0:
                 self.alive = False
-                create_particles(self.x, self.y, WHITE, 50)
+                self.world.create_particles(self.x, self.y, WHITE, 50)
     
     def spawn_clones(self):
         self.clones = []
@@ -223,19 +433,19 @@ class Boss:
             (SCREEN_WIDTH // 2, 150)
         ]
         for pos in positions:
-            self.clones.append(BossClone(pos[0], pos[1], WHITE))
+            self.clones.append(BossClone(self.world, pos[0], pos[1], WHITE))
         self.clones_active = True
     
     def update_animation(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_update > self.animation_speed:
+        now = self.world.tick
+        if now - self.last_update >= self.animation_speed:
             self.last_update = now
             self.frame_index = (self.frame_index + 1) % len(self.animation_frames)
             self.image = self.animation_frames[self.frame_index]
     
     def update(self, player):
         if not self.alive:
-            return []
+            return
         
         # Update animation
         self.update_animation()
@@ -246,7 +456,7 @@ class Boss:
             if self.intro_timer <= 0:
                 self.intro_mode = False
             self.rect.center = (int(self.x), int(self.y))
-            return []
+            return
         
         if self.damage_cooldown > 0:
             self.damage_cooldown -= 1
@@ -269,9 +479,10 @@ class Boss:
         elif self.phase == 2:
             # Teleport pattern
             if self.pattern_timer % 120 == 0:
-                self.x = random.randint(200, SCREEN_WIDTH - 200)
-                self.y = random.randint(150, 350)
-                create_particles(self.x, self.y, WHITE, 15)
+                rng = self.world.boss_rng
+                self.x = rng.randint(200, SCREEN_WIDTH - 200)
+                self.y = rng.randint(150, 350)
+                self.world.create_particles(self.x, self.y, WHITE, 15)
         
         elif self.phase == 3:
             # Aggressive pattern
@@ -297,7 +508,6 @@ class Boss:
         self.rect.center = (int(self.x), int(self.y))
         
         # Attacks
-        projectiles = []
         self.attack_timer -= 1
         
         if self.attack_timer <= 0:
@@ -305,7 +515,7 @@ class Boss:
             
             if self.phase == 1:
                 # Single projectile
-                projectiles.append(Projectile(self.x, self.y, player.rect.centerx, player.rect.centery, 5, WHITE))
+                self.world.fire_projectile(self.x, self.y, player.rect.centerx, player.rect.centery, 5, WHITE)
             
             elif self.phase == 2:
                 # Triple shot
@@ -313,7 +523,7 @@ class Boss:
                     angle = math.atan2(player.rect.centery - self.y, player.rect.centerx - self.x) + angle_offset
                     target_x = self.x + math.cos(angle) * 500
                     target_y = self.y + math.sin(angle) * 500
-                    projectiles.append(Projectile(self.x, self.y, target_x, target_y, 6, WHITE))
+                    self.world.fire_projectile(self.x, self.y, target_x, target_y, 6, WHITE)
             
             elif self.phase == 3:
                 # Spiral pattern
@@ -321,35 +531,22 @@ class Boss:
                     angle = (i / 8) * 2 * math.pi + self.pattern_timer * 0.05
                     target_x = self.x + math.cos(angle) * 500
                     target_y = self.y + math.sin(angle) * 500
-                    projectiles.append(Projectile(self.x, self.y, target_x, target_y, 7, WHITE, 8))
-        
-        return projectiles
+                    self.world.fire_projectile(self.x, self.y, target_x, target_y, 7, WHITE, 8)
     
-    def draw(self):
-        # Get current image and flip if needed
-        img = pygame.transform.flip(self.image, self.flip, False)
+    def draw(self, surface, interp=1.0):
+        # Pick the pre-rendered frame for the current facing, flashing white when taking damage
+        flashing = self.damage_cooldown > 0 and self.damage_cooldown % 4 < 2
+        img = (self.flash_tables if flashing else self.frame_tables)[self.flip][self.frame_index]
         
         # Calculate draw position (center the sprite)
-        draw_x = self.rect.centerx - img.get_width() // 2
-        draw_y = self.rect.centery - img.get_height() // 2
-        
-        # Flash white when taking damage
-        if self.damage_cooldown > 0 and self.damage_cooldown % 4 < 2:
-            # Create white flash
-            flash_img = img.copy()
-            flash_img.fill((255, 255, 255, 200), special_flags=pygame.BLEND_RGB_ADD)
-            screen.blit(flash_img, (draw_x, draw_y))
-        else:
-            screen.blit(img, (draw_x, draw_y))
-        
-        # Boss name
-        font = pygame.font.Font(None, 32)
-        phase_text = f"The Radeanse - PHASE {self.phase}"
-        text = font.render(phase_text, True, WHITE)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 20))
+        ox, oy = lerp_offset(self.prev_pos, self.rect.center, interp)
+        draw_x = self.rect.centerx - img.get_width() // 2 + ox
+        draw_y = self.rect.centery - img.get_height() // 2 + oy
+        return surface.blit(img, (draw_x, draw_y))
 
 class BossClone:
-    def __init__(self, x, y, color):
+    def __init__(self, world, x, y, color):
+        self.world = world
         self.x, self.y = x, y
         self.size = 40
         self.color = color
@@ -359,18 +556,17 @@ class BossClone:
     
     def update(self, player):
         self.lifetime -= 1
-        projectiles = []
         
         if self.lifetime % 60 == 0:
-            projectiles.append(Projectile(self.x, self.y, player.rect.centerx, player.rect.centery, 4, WHITE, 6))
+            self.world.fire_projectile(self.x, self.y, player.rect.centerx, player.rect.centery, 4, WHITE, 6)
         
         self.rect.center = (int(self.x), int(self.y))
-        return projectiles, self.lifetime > 0
+        return self.lifetime > 0
     
-    def draw(self):
-        s = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*self.color, self.alpha), (self.size, self.size), self.size)
-        screen.blit(s, (int(self.x - self.size), int(self.y - self.size)))
+    def draw(self, surface):
+        # Same translucent circle a particle is, so it comes out of the particle sprite cache
+        s = particle_sprites.get((tuple(self.color), self.size, self.alpha))
+        return surface.blit(s, (int(self.x - self.size), int(self.y - self.size)))
 
 # ---------- PLATFORM CLASS ----------
 class Platform(pygame.sprite.Sprite):
@@ -381,117 +577,279 @@ class Platform(pygame.sprite.Sprite):
         self.image = self.image.convert_alpha() if invisible else self.image.convert()
         self.rect = pygame.Rect(x, y, w, h)
 
-platform_group = pygame.sprite.Group()
-
-# Platform setup
-VPLAT_WIDTH, VPLAT_HEIGHT, VPLAT_Y = 25, 100, 600
-VPLAT_LEFT_X, VPLAT_RIGHT_X = 475, 700
-GROUND_Y, GROUND_H = 650, 80
-
-left_x, left_w = 0, max(0, int(VPLAT_LEFT_X))
-mid_x, mid_w = int(VPLAT_LEFT_X), max(0, int(VPLAT_RIGHT_X - VPLAT_LEFT_X))
-right_x, right_w = int(VPLAT_RIGHT_X), max(0, SCREEN_WIDTH - int(VPLAT_RIGHT_X))
-
-platforms = [
-    (left_x, GROUND_Y, left_w, GROUND_H, True),
-    (mid_x, GROUND_Y, mid_w, GROUND_H, True),
-    (right_x, GROUND_Y, right_w, GROUND_H, True),
-    (0, 700, SCREEN_WIDTH, 200, False),
-]
-
-for p_data in platforms:
-    platform = Platform(*p_data)
-    platform_group.add(platform)
-    if p_data[0] == mid_x and p_data[2] == mid_w and p_data[3] == GROUND_H:
-        middle_ground_platform = platform
-
-ROOF_Y, ROOF_H = -350, 400
-for roof_data in [(left_x, ROOF_Y, left_w, ROOF_H, True), (mid_x, ROOF_Y, mid_w, ROOF_H, True), (right_x, ROOF_Y, right_w, ROOF_H, True)]:
-    roof_plat = Platform(*roof_data)
-    platform_group.add(roof_plat)
-    if roof_data[0] == mid_x and roof_data[2] == mid_w:
-        middle_roof_platform = roof_plat
-
-def create_vertical_platforms():
-    global vertical_platforms_active, vertical_platforms
-    if vertical_platforms_active: return
-    
-    p1 = Platform(VPLAT_LEFT_X, VPLAT_Y, VPLAT_WIDTH, VPLAT_HEIGHT, True)
-    p2 = Platform(VPLAT_RIGHT_X, VPLAT_Y, VPLAT_WIDTH, VPLAT_HEIGHT, True)
-    
-    for p in [p1, p2]:
-        orig_rect = p.rect.copy()
-        try: b = p.image.get_bounding_rect()
-        except: b = p.image.get_rect()
-        p.rect = pygame.Rect(orig_rect.x + b.x, orig_rect.y + b.y, b.width, b.height)
-        p._visual_rect = orig_rect
-        platform_group.add(p)
-    
-    vertical_platforms = [p1, p2]
-    vertical_platforms_active = True
-
-def remove_vertical_platforms():
-    global vertical_platforms_active, vertical_platforms
-    for p in list(vertical_platforms):
-        try: platform_group.remove(p)
-        except: pass
-    vertical_platforms = []
-    vertical_platforms_active = False
-
-def create_static_background(black_bg=False):
-    bg_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    bg_surface.fill((0, 0, 0) if black_bg else BG) if black_bg else bg_surface.blit(Back, (0, 0))
-    for platform in platform_group:
-        if black_bg or platform.image.get_alpha() != 0:
-            bg_surface.blit(platform.image, platform.rect)
-    return bg_surface.convert()
-
-static_background = create_static_background()
-
-def draw_bg():
-    screen.blit(static_background, (0, 0))
+class PlatformGrid:
+    """Uniform grid over platform rects so collision only looks at platforms near the mover."""
+    def __init__(self, cell=128):
+        self.cell, self.cells, self.order, self.seq = cell, {}, {}, 0
+
+    def cells_for(self, rect):
+        c = self.cell
+        for cx in range(rect.left // c, (rect.right - 1) // c + 1):
+            for cy in range(rect.top // c, (rect.bottom - 1) // c + 1):
+                yield cx, cy
+
+    def add(self, platform):
+        self.seq += 1
+        self.order[platform] = self.seq
+        for key in self.cells_for(platform.rect):
+            self.cells.setdefault(key, []).append(platform)
+
+    def remove(self, platform):
+        del self.order[platform]
+        for key in self.cells_for(platform.rect):
+            self.cells[key].remove(platform)
+
+    def query(self, rect):
+        found = set()
+        for key in self.cells_for(rect):
+            found.update(self.cells.get(key, ()))
+        # Same order as iterating the group, so collision resolution is unchanged
+        return sorted(found, key=self.order.__getitem__)
+
+class TileMap:
+    """Collision layer on a grid of TILE_SIZE tiles: how many platforms cover each tile (so overlapping
+    platforms can come and go independently). Covers `area`, rounded out to whole tiles; by default the
+    screen width and a screen height above and below, World sizes it to the room.
+    """
+    def __init__(self, area=None, tile=TILE_SIZE):
+        area = area or pygame.Rect(0, -SCREEN_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT * 3)
+        self.tile, self.left, self.top = tile, area.left // tile * tile, area.top // tile * tile
+        cols, rows = -(-(area.right - self.left) // tile), -(-(area.bottom - self.top) // tile)
+        self.counts = np.zeros((rows, cols), np.int16)
+
+    def fits(self, rect):
+        # Only platforms lying exactly on whole tiles inside the map; the rest keep rect collision
+        t, rows, cols = self.tile, *self.counts.shape
+        return (not (rect.x % t or rect.y % t or rect.w % t or rect.h % t) and rect.left >= self.left
+                and rect.right <= self.left + cols * t and rect.top >= self.top and rect.bottom <= self.top + rows * t)
+
+    def mark(self, rect, amount):
+        t, left, top = self.tile, self.left, self.top
+        self.counts[(rect.top - top) // t:(rect.bottom - top) // t, (rect.left - left) // t:(rect.right - left) // t] += amount
+
+    def solid_span(self, rect, axis):
+        """Pixel (start, end) of the solid columns (axis 0) or rows (axis 1) among the tiles rect overlaps, or None."""
+        t, rows, cols = self.tile, *self.counts.shape
+        r0, r1 = max(0, (rect.top - self.top) // t), min(rows, (rect.bottom - 1 - self.top) // t + 1)
+        c0, c1 = max(0, (rect.left - self.left) // t), min(cols, (rect.right - 1 - self.left) // t + 1)
+        if r0 >= r1 or c0 >= c1: return None
+        solid = np.flatnonzero(self.counts[r0:r1, c0:c1].any(axis=axis))
+        if not len(solid): return None
+        if axis == 0: return self.left + (c0 + solid[0]) * t, self.left + (c0 + solid[-1] + 1) * t
+        return self.top + (r0 + solid[0]) * t, self.top + (r0 + solid[-1] + 1) * t
+
+class PlatformGroup(pygame.sprite.Group):
+    """Sprite group that keeps a PlatformGrid and a TileMap in sync with its membership.
+
+    Tile-aligned platforms collide through the tile map; any other platform through its rect.
+    Platform rects must not change while the platform is in the group.
+    """
+    def __init__(self, *sprites):
+        self.grid, self.tiles = PlatformGrid(), TileMap()
+        self.loose = PlatformGrid()  # the platforms that aren't in the tile map
+        self.changed = []  # Screen areas of platforms added/removed since the background last looked
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        if sprite not in self.spritedict:
+            self.grid.add(sprite)
+            if self.tiles.fits(sprite.rect): self.tiles.mark(sprite.rect, 1)
+            else: self.loose.add(sprite)
+            self.changed.append(sprite.rect.union(getattr(sprite, '_visual_rect', sprite.rect)))
+        super().add_internal(sprite, layer)
+
+    def remove_internal(self, sprite):
+        if sprite in self.spritedict:
+            self.grid.remove(sprite)
+            if sprite in self.loose.order: self.loose.remove(sprite)
+            else: self.tiles.mark(sprite.rect, -1)
+            self.changed.append(sprite.rect.union(getattr(sprite, '_visual_rect', sprite.rect)))
+        super().remove_internal(sprite)
+
+    def resize_tiles(self, area):
+        """Rebuilds the tile map to cover area (e.g. a room's bounds) and re-sorts the platforms between it and the rect grid."""
+        self.tiles, self.loose = TileMap(area), PlatformGrid()
+        for platform in sorted(self.grid.order, key=self.grid.order.__getitem__):
+            if self.tiles.fits(platform.rect): self.tiles.mark(platform.rect, 1)
+            else: self.loose.add(platform)
+
+    def near(self, rect, dx=0, dy=0):
+        """Non-tile platforms that rect can touch while moving by (dx, dy), padded by its own size for push-outs."""
+        return self.loose.query(rect.union(rect.move(dx, dy)).inflate(rect.w, rect.h))
+
+    def move_x(self, rect, dx):
+        """Moves rect by dx and pushes it back out of anything solid it swept into.
+        Returns 1 if it hit something on its right, -1 on its left, else 0.
+        """
+        old, hit = rect.copy(), 0
+        nearby = self.near(rect, dx, 0)
+        rect.x += dx
+        # Only the tiles the leading edge swept into, past the ones it already touched: a fast mover can't
+        # skip a tile, and one that is already inside something solid isn't thrown back across it
+        t = self.tiles.tile
+        if dx > 0:
+            start = -(-old.right // t) * t
+            entered = pygame.Rect(start, rect.top, rect.right - start, rect.h)
+        else: entered = pygame.Rect(rect.left, rect.top, old.left // t * t - rect.left, rect.h)
+        span = self.tiles.solid_span(entered, 0) if dx and entered.w > 0 else None
+        if span:
+            if dx > 0: rect.right, hit = span[0], 1
+            else: rect.left, hit = span[1], -1
+        for platform in nearby:
+            if rect.colliderect(platform.rect):
+                if dx > 0: rect.right, hit = platform.rect.left, 1
+                elif dx < 0: rect.left, hit = platform.rect.right, -1
+        return hit
+
+    def move_y(self, rect, dy, vel_y):
+        """Moves rect by dy; falling (vel_y > 0) lands it on top of what it hit, rising bumps it down.
+        Returns 1 if it landed, -1 if it hit its head, else 0.
+        """
+        old, hit = rect.copy(), 0
+        nearby = self.near(rect, 0, dy)
+        rect.y += dy
+        t = self.tiles.tile
+        if vel_y > 0:
+            start = -(-old.bottom // t) * t
+            entered = pygame.Rect(rect.left, start, rect.w, rect.bottom - start)
+        else: entered = pygame.Rect(rect.left, rect.top, rect.w, old.top // t * t - rect.top)
+        span = self.tiles.solid_span(entered, 1) if vel_y and entered.h > 0 else None
+        if span:
+            if vel_y > 0: rect.bottom, hit = span[0], 1
+            else: rect.top, hit = span[1], -1
+        for platform in nearby:
+            if rect.colliderect(platform.rect):
+                if vel_y > 0: rect.bottom, hit = platform.rect.top, 1
+                elif vel_y < 0: rect.top, hit = platform.rect.bottom, -1
+        return hit
+
+# ---------- ROOMS ----------
+class RoomLoader:
+    """Rooms are rooms/<name>.json: platforms, gates, spawns, the exit trigger and the assets they need.
+
+    A room is read the first time it is asked for. prefetch(name) reads it and decodes its assets on a
+    background thread instead (started when the well opens), so entering the room doesn't hitch.
+    """
+    def __init__(self, directory='rooms'):
+        self.directory, self.rooms, self.pending = directory, {}, {}
+        self.pool = ThreadPoolExecutor(1)
+
+    def read(self, name):
+        with open(asset_path(os.path.join(self.directory, f'{name}.json'))) as f: return json.load(f)
+
+    def decode_assets(self, room):
+        # Decoding and scaling are the slow part and safe off the main thread; load_img converts later
+        for asset in room.get('assets', []):
+            path, size = asset['path'], tuple(asset['size']) if 'size' in asset else asset.get('scale')
+            if (path, size) in atlas or (path, size) in prefetched or (path, size, True) in assets: continue
+            try: prefetched[(path, size)] = decode_img(path, size)
+            except: pass
+        return room
+
+    def prefetch(self, name):
+        if name not in self.rooms and name not in self.pending:
+            self.pending[name] = self.pool.submit(lambda: self.decode_assets(self.read(name)))
+
+    def get(self, name):
+        if name in self.pending: self.rooms[name] = self.pending.pop(name).result()
+        elif name not in self.rooms: self.rooms[name] = self.read(name)
+        return self.rooms[name]
+
+rooms = RoomLoader()
+
+def room_background(name):
+    """The room's background image, or a surface filled with its background_color if it has none / it's missing."""
+    key = ('room background', name)
+    if key not in assets:
+        room = rooms.get(name)
+        img = load_img(room['background'], (SCREEN_WIDTH, SCREEN_HEIGHT), False) if 'background' in room else None
+        if img is None:
+            img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            img.fill(room.get('background_color', BG))
+        assets[key] = img
+    return assets[key]
+
+# ---------- BACKGROUND ----------
+class BackgroundCompositor:
+    """Owns the cached background of each room (its image or color, plus the visible platforms).
+
+    Platforms added to or removed from the group only re-compose their own area, and only when that
+    background is next asked for. get() leaves the re-composed areas in self.recomposed.
+    """
+    def __init__(self, platforms):
+        self.platforms = platforms
+        self.surfaces, self.pending = {}, {}
+        self.recomposed = []
+
+    def compose(self, surface, room, area):
+        surface.set_clip(area)
+        surface.blit(room_background(room), (0, 0))
+        for platform in self.platforms.grid.query(area):
+            if platform.image.get_alpha() != 0:
+                surface.blit(platform.image, platform.rect)
+        surface.set_clip(None)
+
+    def get(self, room):
+        if self.platforms.changed:
+            for regions in self.pending.values(): regions.extend(self.platforms.changed)
+            self.platforms.changed = []
+        surface, self.recomposed = self.surfaces.get(room), []
+        if surface is None:
+            surface = self.surfaces[room] = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.compose(surface, room, surface.get_rect())
+        else:
+            screen_rect = surface.get_rect()
+            self.recomposed = [r.clip(screen_rect) for r in self.pending.get(room, []) if r.colliderect(screen_rect)]
+            for area in self.recomposed:
+                self.compose(surface, room, area)
+        self.pending[room] = []
+        return surface
 
-def draw_well():
-    if well_img: screen.blit(well_img, (450, 575))
+def draw_well(surface, pos):
+    if well_img: return surface.blit(well_img, pos)
 
-def draw_well_front():
-    if well2_img: screen.blit(well2_img, (450, 612))
-
-def enemy1_dead():
-    create_vertical_platforms()
-    for plat, name in [(middle_ground_platform, 'ground'), (middle_roof_platform, 'roof')]:
-        try:
-            platform_group.remove(plat)
-            static_background = create_static_background()
-        except: pass
+def draw_well_front(surface, pos):
+    if well2_img: return surface.blit(well2_img, pos)
 
 # ---------- LOAD ANIMATIONS ----------
 def load_animations(char_type, types, scale, color=(0, 100, 200)):
+    """Returns (animation_list, flipped_list); cached so every Player/Enemy1 shares the same frames."""
+    key = ('anim', char_type, tuple(types), scale, color)
+    if key in assets: return assets[key]
     animation_list = []
     for anim in types:
         temp_list = []
         try:
             path = f'img/{char_type}/{anim}'
-            if os.path.exists(path):
-                for i in range(len(os.listdir(path))):
-                    img = load_img(f'{path}/{i}.png', alpha=True)
-                    img = pygame.transform.scale(img, (int(img.get_width() * scale), int(img.get_height() * scale)))
+            if os.path.exists(asset_path(path)):
+                for i in range(len(os.listdir(asset_path(path)))):
+                    img = load_img(f'{path}/{i}.png', scale)
+                    if img is None: raise FileNotFoundError(f'{path}/{i}.png')
                     temp_list.append(img)
             else:
-                for _ in range(4):
-                    img = pygame.Surface((70 if char_type == 'enemy' else 60, 90 if char_type == 'enemy' else 80))
-                    temp_list.append(img.fill(color).convert())
+                temp_list = placeholder_frames(char_type, color)
         except:
-            for _ in range(4):
-                img = pygame.Surface((70 if char_type == 'enemy' else 60, 90 if char_type == 'enemy' else 80))
-                temp_list.append(img.fill(color).convert())
+            temp_list = placeholder_frames(char_type, color)
         animation_list.append(temp_list)
-    return animation_list
+    assets[key] = animation_list, [flip_frames(frames) for frames in animation_list]
+    return assets[key]
+
+def placeholder_frames(char_type, color):
+    frames = []
+    for _ in range(4):
+        img = pygame.Surface((70 if char_type == 'enemy' else 60, 90 if char_type == 'enemy' else 80)).convert()
+        img.fill(color)
+        frames.append(img)
+    return frames
+
+def flip_frames(frames):
+    return [pygame.transform.flip(img, True, False) for img in frames]
 
 # ---------- ENEMY CLASS ----------
 class Enemy1(pygame.sprite.Sprite):
-    def __init__(self, x, y, scale, speed):
+    def __init__(self, world, x, y, scale, speed):
         super().__init__()
+        self.world = world
         self.alive = True
         self.speed, self.direction, self.flip = speed * 2.5, -1, False
         self.max_health, self.health = 120, 120
@@ -500,10 +858,11 @@ class Enemy1(pygame.sprite.Sprite):
         self.can_jump, self.jump_cooldown, self.jump_timer, self.is_jumping = True, 0, 180, False
         self.state, self.detection_range, self.reaction_time = 'patrol', 250, 60
         self.detection_timer = 0
-        self.animation_list = load_animations('enemy', ['Idle', 'Run'], scale, (255, 0, 0))
-        self.frame_index, self.action, self.update_time = 0, 0, pygame.time.get_ticks()
-        self.image = self.animation_list[self.action][self.frame_index]
+        self.animation_list, self.flipped_list = load_animations('enemy', ['Idle', 'Run'], scale, (255, 0, 0))
+        self.frame_index, self.action, self.update_time = 0, 0, world.tick
+        self.image, self.image_flipped = self.animation_list[self.action][self.frame_index], self.flipped_list[self.action][self.frame_index]
         self.rect = self.image.get_rect(center=(x, y))
+        self.prev_pos = self.rect.bottomleft
 
     def take_damage(self, damage):
         self.health = max(0, self.health - damage)
@@ -536,7 +895,7 @@ class Enemy1(pygame.sprite.Sprite):
                 target_x = self.start_x + (patrol_range * self.direction)
 
             # Random jump while patrolling
-            if not self.in_air and self.jump_cooldown == 0 and random.random() < enemy1_JUMP_CHANCE:
+            if not self.in_air and self.jump_cooldown == 0 and self.world.ai_rng.random() < enemy1_JUMP_CHANCE:
                 self.vel_y, self.in_air, self.jump_cooldown = JUMP_SPEED * 0.8, True, 60
 
         elif self.state == 'chase':
@@ -574,24 +933,13 @@ class Enemy1(pygame.sprite.Sprite):
         self.vel_y = min(10, self.vel_y + GRAVITY)
         dy += self.vel_y
 
-        self.rect.x += dx
-        for platform in platform_group:
-            if self.rect.colliderect(platform.rect):
-                if dx > 0:
-                    self.rect.right = platform.rect.left
-                    if self.state == 'patrol': self.direction, self.flip = -1, True
-                elif dx < 0:
-                    self.rect.left = platform.rect.right
-                    if self.state == 'patrol': self.direction, self.flip = 1, False
-
-        self.rect.y += dy
+        hit = self.world.platforms.move_x(self.rect, dx)
+        if hit and self.state == 'patrol': self.direction, self.flip = -hit, hit > 0
+
+        hit = self.world.platforms.move_y(self.rect, dy, self.vel_y)
         self.in_air = True
-        for platform in platform_group:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_y > 0:
-                    self.rect.bottom, self.vel_y, self.in_air, self.is_jumping = platform.rect.top, 0, False, False
-                elif self.vel_y < 0:
-                    self.rect.top, self.vel_y = platform.rect.bottom, 0
+        if hit > 0: self.vel_y, self.in_air, self.is_jumping = 0, False, False
+        elif hit < 0: self.vel_y = 0
 
         if self.rect.left < 0:
             self.rect.left = 0
@@ -602,27 +950,27 @@ class Enemy1(pygame.sprite.Sprite):
 
     def update_animation(self):
         old_bottom, old_centerx = self.rect.bottom, self.rect.centerx
-        self.image = self.animation_list[self.action][self.frame_index]
+        self.image, self.image_flipped = self.animation_list[self.action][self.frame_index], self.flipped_list[self.action][self.frame_index]
         self.rect = self.image.get_rect(centerx=old_centerx, bottom=old_bottom)
         
-        if pygame.time.get_ticks() - self.update_time > 50:
-            self.update_time = pygame.time.get_ticks()
+        if self.world.tick - self.update_time >= 3:
+            self.update_time = self.world.tick
             self.frame_index = (self.frame_index + 1) % len(self.animation_list[self.action])
 
     def update_action(self, new_action):
         if new_action != self.action:
-            self.action, self.frame_index, self.update_time = new_action, 0, pygame.time.get_ticks()
+            self.action, self.frame_index, self.update_time = new_action, 0, self.world.tick
 
-    def draw(self):
-        self.update_action(1 if abs(self.speed) > 0 and self.state in ['chase', 'patrol'] else 0)
-        self.update_animation()
-        img = pygame.transform.flip(self.image, self.flip, False)
-        screen.blit(img, (self.rect.left, self.rect.bottom - img.get_height()))
+    def draw(self, surface, interp=1.0):
+        img = self.image_flipped if self.flip else self.image
+        ox, oy = lerp_offset(self.prev_pos, self.rect.bottomleft, interp)
+        return surface.blit(img, (self.rect.left + ox, self.rect.bottom - img.get_height() + oy))
 
 # ---------- PLAYER CLASS ----------
 class Player(pygame.sprite.Sprite):
-    def __init__(self, char_type, x, y, scale, speed):
+    def __init__(self, world, char_type, x, y, scale, speed):
         super().__init__()
+        self.world = world
         self.alive, self.char_type, self.speed, self.direction, self.flip = True, char_type, speed, 1, False
         self.max_masks, self.current_masks, self.damage_cooldown = 5, 5, 0
         self.vel_y, self.in_air, self.jump_pressed, self.jump_timer = 0, True, False, 0
@@ -630,10 +978,11 @@ class Player(pygame.sprite.Sprite):
         self.dashing, self.dash_timer, self.dash_cooldown = False, 0, 0
         self.attacking, self.attack_type, self.attack_timer, self.attack_cooldown, self.attack_rect = False, None, 0, 0, None
         
-        self.animation_list = load_animations('player', ['Idle', 'Run', 'Jump', 'Fall', 'Dash', 'Attack', 'Attack_Up', 'Attack_Down'], scale)
-        self.frame_index, self.action, self.update_time = 0, 0, pygame.time.get_ticks()
-        self.image = self.animation_list[self.action][self.frame_index]
+        self.animation_list, self.flipped_list = load_animations('player', ['Idle', 'Run', 'Jump', 'Fall', 'Dash', 'Attack', 'Attack_Up', 'Attack_Down'], scale)
+        self.frame_index, self.action, self.update_time = 0, 0, world.tick
+        self.image, self.image_flipped = self.animation_list[self.action][self.frame_index], self.flipped_list[self.action][self.frame_index]
         self.rect = self.image.get_rect(center=(x, y))
+        self.prev_pos = self.rect.bottomleft
 
     def take_damage(self, damage):
         if self.damage_cooldown == 0 and not self.dashing:
@@ -650,15 +999,14 @@ class Player(pygame.sprite.Sprite):
             x = self.rect.right if self.direction == 1 else self.rect.left - ATTACK_RANGE
             return pygame.Rect(x, self.rect.centery - ATTACK_HEIGHT // 2, ATTACK_RANGE, ATTACK_HEIGHT)
 
-    def attack(self):
+    def attack(self, controls):
         if self.attack_cooldown > 0 or self.dashing: return
         
-        keys = pygame.key.get_pressed()
         self.attacking, self.attack_cooldown = True, 20
         
-        if keys[pygame.K_w]:
+        if controls.up:
             self.attack_type, animation_index = 'up', 6
-        elif keys[pygame.K_s] and self.in_air:
+        elif controls.down and self.in_air:
             self.attack_type, animation_index = 'down', 7
         else:
             self.attack_type, animation_index = 'side', 5
@@ -667,17 +1015,13 @@ class Player(pygame.sprite.Sprite):
         self.update_action(animation_index)
         self.attack_rect = self.create_attack_hitbox(self.attack_type)
 
-    def move(self, moving_left, moving_right):
-        global waiting_for_reentry, waiting_for_reentry_counter, well_img, well2_img, boss_env_suppressed, roof_restored, middle_platforms_visible
-        global boss_fight_active, boss
-        
+    def move(self, controls):
+        moving_left, moving_right = controls.left, controls.right
         dx = dy = 0
-        keys = pygame.key.get_pressed()
-        mouse = pygame.mouse.get_pressed()
 
         if self.damage_cooldown > 0: self.damage_cooldown -= 1
 
-        if mouse[2] and not self.dashing and self.dash_cooldown == 0 and not self.attacking:
+        if controls.dash and not self.dashing and self.dash_cooldown == 0 and not self.attacking:
             self.dashing, self.dash_timer, self.dash_cooldown, self.vel_y = True, DASH_TIME, DASH_COOLDOWN, 0
             self.update_action(4)
 
@@ -690,7 +1034,7 @@ class Player(pygame.sprite.Sprite):
             if moving_left: dx, self.flip, self.direction = -self.speed, True, -1
             if moving_right: dx, self.flip, self.direction = self.speed, False, 1
 
-            if keys[pygame.K_SPACE]:
+            if controls.jump:
                 if not self.jump_pressed:
                     self.jump_pressed = True
                     if not self.in_air:
@@ -723,15 +1067,8 @@ class Player(pygame.sprite.Sprite):
 
         if self.attack_cooldown > 0: self.attack_cooldown -= 1
 
-        self.rect.x += dx
-        for platform in platform_group:
-            if self.rect.colliderect(platform.rect):
-                if dx > 0:
-                    self.rect.right = platform.rect.left
-                    if self.in_air: self.wall_sliding, self.wall_side = True, 1
-                elif dx < 0:
-                    self.rect.left = platform.rect.right
-                    if self.in_air: self.wall_sliding, self.wall_side = True, -1
+        hit = self.world.platforms.move_x(self.rect, dx)
+        if hit and self.in_air: self.wall_sliding, self.wall_side = True, hit
 
         if self.in_air and self.vel_y > 0:
             if self.rect.left <= 0:
@@ -747,41 +1084,21 @@ class Player(pygame.sprite.Sprite):
             self.rect.right = min(SCREEN_WIDTH, self.rect.right)
             self.wall_sliding, self.wall_side = False, 0
 
-        self.rect.y += dy
+        hit = self.world.platforms.move_y(self.rect, dy, self.vel_y)
         self.in_air = True
-        for platform in platform_group:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_y > 0:
-                    self.rect.bottom, self.vel_y, self.in_air, self.jump_timer = platform.rect.top, 0, False, 0
-                    self.wall_sliding, self.wall_side = False, 0
-                elif self.vel_y < 0:
-                    self.rect.top, self.vel_y = platform.rect.bottom, 0
+        if hit > 0: self.vel_y, self.in_air, self.jump_timer, self.wall_sliding, self.wall_side = 0, False, 0, False, 0
+        elif hit < 0: self.vel_y = 0
 
         # Check if falling through well - trigger boss fight
-        if self.rect.top > SCREEN_HEIGHT - 200 and not boss_fight_active:
-            try: img_h = self.image.get_height()
-            except: img_h = 64
-            
-            self.rect.top, self.vel_y = -img_h - 300, 0
-            
-            try:
-                well_img, well2_img, boss_env_suppressed, roof_restored = None, None, True, False
-                if middle_ground_platform not in platform_group:
-                    platform_group.add(middle_ground_platform)
-                    middle_platforms_visible = True
-                remove_vertical_platforms()
-            except: pass
-            
-            waiting_for_reentry, waiting_for_reentry_counter = True, 120
-            boss_fight_active = True
-            boss = Boss(SCREEN_WIDTH // 2, -100)
+        if self.rect.top > self.world.room['exit']['below'] and not self.world.boss_fight_active:
+            self.world.enter_boss_room()
 
     def update_animation(self):
-        cooldown = 3 if self.action in [5, 6, 7] else 100
-        self.image = self.animation_list[self.action][self.frame_index]
+        cooldown = 1 if self.action in [5, 6, 7] else 6  # ticks per frame: attacks run at the full 60 Hz
+        self.image, self.image_flipped = self.animation_list[self.action][self.frame_index], self.flipped_list[self.action][self.frame_index]
         
-        if pygame.time.get_ticks() - self.update_time > cooldown:
-            self.update_time = pygame.time.get_ticks()
+        if self.world.tick - self.update_time >= cooldown:
+            self.update_time = self.world.tick
             self.frame_index += 1
             if self.frame_index >= len(self.animation_list[self.action]):
                 if self.action in [5, 6, 7]:
@@ -794,23 +1111,22 @@ class Player(pygame.sprite.Sprite):
 
     def update_action(self, new_action):
         if new_action != self.action:
-            self.action, self.frame_index, self.update_time = new_action, 0, pygame.time.get_ticks()
+            self.action, self.frame_index, self.update_time = new_action, 0, self.world.tick
 
-    def draw(self):
-        img = pygame.transform.flip(self.image, self.flip, False)
-        draw_x, draw_y = self.rect.left, self.rect.bottom - img.get_height()
+    def draw(self, surface, interp=1.0):
+        img = self.image_flipped if self.flip else self.image
+        ox, oy = lerp_offset(self.prev_pos, self.rect.bottomleft, interp)
+        draw_x, draw_y = self.rect.left + ox, self.rect.bottom - img.get_height() + oy
         
         if self.action == 5:
             draw_x += 15 if self.direction == 1 else -30
         elif self.action == 7:
             draw_y += 30
         
-        if self.damage_cooldown > 0 and self.damage_cooldown % 10 < 5:
-            img.set_alpha(128)
-        else:
-            img.set_alpha(255)
+        # Frames are shared, so the blink alpha is set on every draw rather than only when blinking
+        img.set_alpha(128 if self.damage_cooldown > 0 and self.damage_cooldown % 10 < 5 else 255)
         
-        screen.blit(img, (draw_x, draw_y))
+        return surface.blit(img, (draw_x, draw_y))
 
 def check_combat(player, enemy1):
     if player.attacking and player.attack_rect and enemy1.alive:
@@ -824,119 +1140,506 @@ def check_combat(player, enemy1):
     if enemy1.alive and player.alive and player.rect.colliderect(enemy1.rect):
         player.take_damage(1)
 
-def draw_enemy1_health_bar(enemy1):
-    if enemy1.alive and enemy1.health < enemy1.max_health:
+# ---------- HUD ----------
+fonts = {}
+
+def get_font(size):
+    if size not in fonts: fonts[size] = pygame.font.Font(None, size)
+    return fonts[size]
+
+text_cache = SurfaceCache(lambda text, size, color: get_font(size).render(text, True, color))
+
+class HUD:
+    """Health masks, boss title and enemy bar, each kept as a surface that is rebuilt only when its value changes."""
+    def __init__(self):
+        self.masks_key = self.masks_surface = None
+        self.bar_key = self.bar_surface = None
+        self.renders = 0  # How many HUD surfaces were rebuilt (text renders are counted by text_cache)
+
+    def draw_health_masks(self, surface, current_masks, max_masks=5):
+        if self.masks_key != (current_masks, max_masks):
+            self.masks_key, self.renders = (current_masks, max_masks), self.renders + 1
+            step = mask_filled.get_width() + 10
+            self.masks_surface = pygame.Surface((max_masks * step - 10, mask_filled.get_height()), pygame.SRCALPHA)
+            for i in range(max_masks):
+                self.masks_surface.blit(mask_filled if i < current_masks else mask_empty, (i * step, 0))
+        return surface.blit(self.masks_surface, (20, 20))
+
+    def draw_boss_title(self, surface, boss):
+        text = text_cache.get((f"The Radeanse - PHASE {boss.phase}", 32, WHITE))
+        return surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 20))
+
+    def draw_enemy1_health_bar(self, surface, enemy1):
+        if not (enemy1.alive and enemy1.health < enemy1.max_health): return None
         bar_w, bar_h = 50, 5
-        bar_x, bar_y = enemy1.rect.centerx - bar_w // 2, enemy1.rect.top - 15
-        pygame.draw.rect(screen, RED, (bar_x, bar_y, bar_w, bar_h))
-        pygame.draw.rect(screen, GREEN, (bar_x, bar_y, int(bar_w * (enemy1.health / enemy1.max_health)), bar_h))
-
-def draw_main_menu():
-    try:
-        menu = load_img('img/BG/main_screen.png', (SCREEN_WIDTH, SCREEN_HEIGHT), False)
-        screen.blit(menu, (0, 0))
-    except:
-        screen.fill((50, 50, 100))
-        font = pygame.font.Font(None, 74)
-        screen.blit(font.render('POXXEL', True, WHITE), font.render('POXXEL', True, WHITE).get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50)))
-        font_small = pygame.font.Font(None, 36)
-        screen.blit(font_small.render('Click anywhere to start', True, WHITE), font_small.render('Click anywhere to start', True, WHITE).get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)))
-
-def restart_game():
-    global player, enemy1, roof_restored, boss_fight_active, boss, particles, enemy1_dead_handled
-    global well_img, well2_img, boss_env_suppressed, middle_platforms_visible, waiting_for_reentry
-    global vertical_platforms_active, vertical_platforms
-    
-    # Reset player
-    player = Player('player', 200, 200, 3, 5)
-    
-    # If we were in boss fight, reset to original room state
-    if boss_fight_active or boss_env_suppressed:
-        # Reset enemy1 to alive
-        enemy1 = Enemy1(800, 500, 2, 2)
-        enemy1_dead_handled = False
+        if self.bar_key != (enemy1.health, enemy1.max_health):
+            self.bar_key, self.renders = (enemy1.health, enemy1.max_health), self.renders + 1
+            self.bar_surface = pygame.Surface((bar_w, bar_h)).convert()
+            self.bar_surface.fill(RED)
+            self.bar_surface.fill(GREEN, (0, 0, int(bar_w * (enemy1.health / enemy1.max_health)), bar_h))
+        return surface.blit(self.bar_surface, (enemy1.rect.centerx - bar_w // 2, enemy1.rect.top - 15))
+
+hud = HUD()
+
+# ---------- DIRTY-RECT RENDERING ----------
+class DirtyRenderer:
+    """Remembers every rect drawn in a frame so the next frame only restores the background under those
+    and display.update gets just the old + new regions. invalidate() forces one full redraw and update."""
+    def __init__(self):
+        self.drawn, self.previous, self.full = [], [], True
+        self.background = None
+
+    def invalidate(self):
+        self.full = True
+
+    def mark(self, drawn):
+        if isinstance(drawn, pygame.Rect): self.drawn.append(drawn)
+        elif drawn: self.drawn.extend(drawn)
+
+    def restore(self, surface, background, changed=()):
+        """changed: areas of the background itself that were re-composed since last frame."""
+        if background is not self.background: self.full, self.background = True, background
+        if self.full: surface.blit(background, (0, 0))
+        else:
+            surface.blits([(background, r, r) for r in self.previous], False)
+            self.mark(surface.blits([(background, r, r) for r in changed]))
+
+    def flush(self):
+        if self.full: pygame.display.update()
+        elif self.previous or self.drawn: pygame.display.update(self.previous + self.drawn)
+        self.previous, self.drawn, self.full = self.drawn, [], False
+
+renderer = DirtyRenderer()
+
+# ---------- PROFILER ----------
+def skip_lap(name):
+    pass
+
+class FrameProfiler:
+    """Per-section frame timings for the F2 overlay, averaged over the last `window` frames.
+
+    lap(name) charges the time since the previous lap to `name`; end_frame() closes the frame and,
+    if a CSV path was given, writes one row with every section time and count.
+    """
+    SECTIONS = ['particles', 'boss', 'projectiles', 'combat', 'player', 'enemy',
+                'background', 'particle draw', 'sprites', 'hud', 'overlay', 'events', 'flip']
+
+    def __init__(self, window=60, csv_path=None):
+        self.history = {name: deque(maxlen=window) for name in self.SECTIONS}
+        self.frame, self.counts, self.last = {}, {}, time.perf_counter()
+        self.frames, self.overlay = 0, None
+        self.csv_file = self.csv = None
+        if csv_path:
+            self.csv_file = open(csv_path, 'w', newline='')
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(['frame'] + [f'{name} ms' for name in self.SECTIONS] + ['particles', 'projectiles', 'clones', 'surfaces'])
+
+    def mark(self):
+        # Start timing from here; whatever ran since the last lap is not charged to any section
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.frame[name] = self.frame.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def end_frame(self, counts):
+        for name in self.SECTIONS:
+            self.history[name].append(self.frame.get(name, 0.0))
+        if self.csv:
+            self.csv.writerow([self.frames] + [f'{self.frame.get(name, 0.0) * 1000:.4f}' for name in self.SECTIONS] +
+                              [counts.get(k, 0) for k in ('particles', 'projectiles', 'clones', 'surfaces')])
+        self.frame, self.counts = {}, counts
+        self.frames += 1
+
+    def average_ms(self, name):
+        times = self.history[name]
+        return sum(times) / len(times) * 1000 if times else 0.0
+
+    def draw(self, surface):
+        # Re-rendered a few times per second; the text changes every frame and would flood text_cache
+        if self.overlay is None or self.frames % 15 == 0:
+            font = get_font(20)
+            rows = [(name, f"{self.average_ms(name):.3f} ms") for name in self.SECTIONS]
+            rows.append(('total', f"{sum(self.average_ms(name) for name in self.SECTIONS):.3f} ms"))
+            rows += [(k, str(v)) for k, v in self.counts.items()]
+            rows = [(font.render(label, True, WHITE), font.render(value, True, WHITE)) for label, value in rows]
+            label_w, value_w = max(l.get_width() for l, _ in rows), max(v.get_width() for _, v in rows)
+            self.overlay = pygame.Surface((label_w + value_w + 24, len(rows) * 18 + 8), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 170))
+            for i, (label, value) in enumerate(rows):
+                self.overlay.blit(label, (6, 4 + i * 18))
+                self.overlay.blit(value, (label_w + value_w + 18 - value.get_width(), 4 + i * 18))
+        return surface.blit(self.overlay, (SCREEN_WIDTH - self.overlay.get_width() - 10, 80))
+
+    def close(self):
+        if self.csv_file: self.csv_file.close()
+
+def surface_allocations():
+    """Surfaces built so far by the sprite, text and HUD caches."""
+    return particle_sprites.misses + projectile_sprites.misses + text_cache.misses + hud.renders
+
+# ---------- MAIN MENU ----------
+class MainMenu:
+    """Title screen: composed once, blitted again only after invalidate() (e.g. the window was exposed)."""
+    def __init__(self):
+        self.surface = load_img('img/BG/main_screen.png', (SCREEN_WIDTH, SCREEN_HEIGHT), False)
+        if self.surface is None:
+            self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.surface.fill((50, 50, 100))
+            title = text_cache.get(('POXXEL', 74, WHITE))
+            prompt = text_cache.get(('Click anywhere to start', 36, WHITE))
+            self.surface.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50)))
+            self.surface.blit(prompt, prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)))
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    def draw(self, surface):
+        """Returns True if the screen was redrawn and needs a display update."""
+        if not self.dirty: return False
+        surface.blit(self.surface, (0, 0))
+        self.dirty = False
+        return True
+
+main_menu = None  # built by init_display()
+
+# ---------- DISPLAY ----------
+def init_display(headless=False):
+    """Opens the window, or with headless=True SDL's dummy driver (the same code, no window), then loads
+    everything that needs a display to convert to. Must run before building a World; later calls do nothing.
+    """
+    global screen, atlas, main_menu
+    if screen is not None: return screen
+    if headless: os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption('Poxxel')
+    atlas = load_atlas()
+    load_ui_images()
+    main_menu = MainMenu()
+    return screen
+
+# ---------- INPUT ----------
+# One frame of player input; the game only ever reads input through this
+Controls = namedtuple('Controls', 'left right jump up down attack dash')
+NO_CONTROLS = Controls(False, False, False, False, False, False, False)
+
+def poll_controls(attack_clicked):
+    keys, mouse = pygame.key.get_pressed(), pygame.mouse.get_pressed()
+    return Controls(moving_left, moving_right, keys[pygame.K_SPACE], keys[pygame.K_w], keys[pygame.K_s], attack_clicked, mouse[2])
+
+# Input recordings: a header (magic, version, world seed) then one byte of Controls bits per simulation step.
+# Replaying one through World(seed).step() reproduces the run exactly; debug keys are not recorded.
+RECORDING_HEADER, RECORDING_MAGIC, RECORDING_VERSION = struct.Struct('<4sBI'), b'PXKI', 1
+
+def pack_controls(controls):
+    return sum(1 << i for i, pressed in enumerate(controls) if pressed)
+
+CONTROLS_BY_BITS = [Controls(*(bool(bits >> i & 1) for i in range(len(Controls._fields)))) for bits in range(1 << len(Controls._fields))]
+
+class InputRecorder:
+    def __init__(self, path, seed):
+        self.file = open(path, 'wb')
+        self.file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, seed))
+        self.frames = 0
+
+    def record(self, controls):
+        self.file.write(bytes((pack_controls(controls),)))
+        self.frames += 1
+        return controls
+
+    def close(self):
+        self.file.close()
+
+def load_recording(path):
+    """Returns (seed, list of Controls) from a file written by InputRecorder."""
+    with open(path, 'rb') as f: data = f.read()
+    try: magic, version, seed = RECORDING_HEADER.unpack_from(data)
+    except struct.error: magic, version, seed = None, None, None
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+        raise ValueError(f"{path} is not a version {RECORDING_VERSION} input recording")
+    return seed, [CONTROLS_BY_BITS[bits] for bits in data[RECORDING_HEADER.size:]]
+
+# ---------- WORLD ----------
+# Entity attributes that are shared assets or back-references rather than state; snapshots leave them out
+SNAPSHOT_SKIP = {'world', 'animation_list', 'flipped_list', 'frame_tables', 'flash_tables', 'animation_frames', 'image', 'image_flipped'}
+SNAPSHOT_VERSION = 1
+
+def entity_state(obj):
+    return {k: v for k, v in vars(obj).items() if k not in SNAPSHOT_SKIP and not k.startswith('_')}
+
+def pack_rng_state(rng):
+    # Mersenne Twister state as raw uint32s: 2.5 KB instead of ~4 KB of pickled ints, and much faster
+    version, internal, gauss_next = rng.getstate()
+    return version, array('I', internal).tobytes(), gauss_next
+
+def unpack_rng_state(rng, state):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(array('I', internal)), gauss_next))
+
+class SnapshotUnpickler(pickle.Unpickler):
+    """Rebuilds only what snapshots are made of (NumPy arrays, Rects, BossConfig and plain builtins).
+    A blob from somewhere else, e.g. a netcode peer, can't name any other callable the way it could
+    with pickle.loads."""
+    ALLOWED = {('numpy', 'dtype'), ('numpy', 'ndarray'), ('numpy._core.numeric', '_frombuffer'), ('numpy.core.numeric', '_frombuffer'),
+               ('numpy._core.multiarray', '_reconstruct'), ('numpy.core.multiarray', '_reconstruct'),
+               ('pygame', '__rect_constructor'), ('pygame.rect', 'Rect')}
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED: return super().find_class(module, name)
+        if name == 'BossConfig' and module in ('main_angelo', '__main__'): return BossConfig
+        raise pickle.UnpicklingError(f"snapshot can't contain {module}.{name}")
+
+def load_snapshot(blob):
+    return SnapshotUnpickler(io.BytesIO(blob)).load()
+
+class World:
+    """One independent game: player, enemy, boss, projectiles, particles, platforms and room flags.
+
+    step(controls) advances the simulation one frame; render(surface) draws it. Nothing here touches
+    the display or the event queue, so any number of worlds can run side by side. Worlds built with the
+    same seed and fed the same controls play out identically.
+    """
+    def __init__(self, seed=None, boss_config=BossConfig(), room='first_room'):
+        self.boss_config, self.room = boss_config, rooms.get(room)
+        self.particles = ParticlePool()
+        self.projectiles = ProjectilePool()
+        self.platforms = PlatformGroup()
+        self.backgrounds = BackgroundCompositor(self.platforms)
+        self.vertical_platforms, self.vertical_platforms_active = [], False
+        self.build_room()
+        self.tick = 0  # simulation steps so far; the only clock animations read
+        self.profiler = None  # a FrameProfiler while the F2 overlay is on
+        self.reseed(seed)
+
+        self.roof_restored = self.waiting_for_reentry = False
+        self.waiting_for_reentry_counter = 0
+        self.middle_platforms_visible = True
+        self.enemy1_dead_handled = self.boss_env_suppressed = self.boss_fight_active = False
+        self.boss = None
+        self.player, self.enemy1 = self.spawn_player(), self.spawn_enemy1()
+
+    def spawn_player(self):
+        return Player(self, 'player', *self.room['spawns']['player'], 3, 5)
+
+    def spawn_enemy1(self):
+        return Enemy1(self, *self.room['spawns']['enemy1'], 2, 2)
+
+    def reseed(self, seed=None):
+        """Separate streams for enemy AI, boss patterns and particles, so cosmetic draws never shift gameplay.
+
+        Any int is accepted and reduced to 0..2**32-1, the range NumPy and the recording header take.
+        """
+        self.seed = random.randrange(2 ** 32) if seed is None else seed % 2 ** 32
+        self.ai_rng = random.Random(f'{self.seed}:ai')
+        self.boss_rng = random.Random(f'{self.seed}:boss')
+        self.particles.rng = np.random.default_rng([self.seed, 2])
+
+    def build_room(self):
+        # The tile map spans whatever the room's platforms and gates cover, however large the room is
+        rects = [pygame.Rect(p_data['rect']) for p_data in self.room['platforms']] + [pygame.Rect(r) for r in self.room.get('gates', [])]
+        if rects: self.platforms.resize_tiles(rects[0].unionall(rects[1:]))
+        # The middle ground and roof are the ones the well and the boss entry take away and put back
+        for p_data in self.room['platforms']:
+            platform = Platform(*p_data['rect'], p_data.get('invisible', False))
+            self.platforms.add(platform)
+            if p_data.get('id') == 'middle_ground': self.middle_ground_platform = platform
+            elif p_data.get('id') == 'middle_roof': self.middle_roof_platform = platform
+
+    def create_particles(self, x, y, color, count=15):
+        self.particles.emit(x, y, color, count)
+
+    def fire_projectile(self, x, y, target_x, target_y, speed, color, size=10):
+        self.projectiles.fire(x, y, target_x, target_y, speed, color, size)
+
+    def create_vertical_platforms(self):
+        if self.vertical_platforms_active: return
         
-        # Restore normal background
-        boss_env_suppressed = False
-        waiting_for_reentry = False
+        gates = [Platform(*rect, True) for rect in self.room['gates']]
         
-        # Restore well images
-        well_img = load_img('img/BG/well1.png', (WELL_WIDTH, WELL_HEIGHT))
-        well2_img = load_img('img/BG/well2.png', (WELL_WIDTH, WELL_HEIGHT))
+        for p in gates:
+            orig_rect = p.rect.copy()
+            try: b = p.image.get_bounding_rect()
+            except: b = p.image.get_rect()
+            p.rect = pygame.Rect(orig_rect.x + b.x, orig_rect.y + b.y, b.width, b.height)
+            p._visual_rect = orig_rect
+            self.platforms.add(p)
         
-        # Reset platforms to original state
-        try:
-            # Remove vertical platforms if they exist
-            remove_vertical_platforms()
-            
-            # Add back middle platforms if they were removed
-            if middle_ground_platform not in platform_group:
-                platform_group.add(middle_ground_platform)
-            if middle_roof_platform not in platform_group:
-                platform_group.add(middle_roof_platform)
-            
-            middle_platforms_visible = True
-        except:
-            pass
-    
-    roof_restored = False
-    boss_fight_active = False
-    boss = None
-    particles = []
+        self.vertical_platforms = gates
+        self.vertical_platforms_active = True
 
-# ---------- MAIN LOOP ----------
-player, enemy1, game_state = Player('player', 200, 200, 3, 5), Enemy1(800, 500, 2, 2), 'menu'
-boss_projectiles = []
+    def remove_vertical_platforms(self):
+        for p in list(self.vertical_platforms):
+            try: self.platforms.remove(p)
+            except: pass
+        self.vertical_platforms = []
+        self.vertical_platforms_active = False
+
+    def enemy1_dead(self):
+        rooms.prefetch(self.room['exit']['room'])  # the well is open: start loading what lies below
+        self.create_vertical_platforms()
+        for plat in [self.middle_ground_platform, self.middle_roof_platform]:
+            try: self.platforms.remove(plat)
+            except: pass
 
-run = True
-while run:
-    clock.tick(FPS)
-    
-    if game_state == 'menu':
-        draw_main_menu()
-    elif game_state == 'playing':
-        # Background
-        if waiting_for_reentry or boss_env_suppressed:
-            screen.fill((0, 0, 0))
+    def enter_boss_room(self):
+        player, arena = self.player, rooms.get(self.room['exit']['room'])
+        try: img_h = player.image.get_height()
+        except: img_h = 64
+        
+        player.rect.top, player.vel_y = -img_h + arena['entry']['player_top'], 0
+        
+        try:
+            self.boss_env_suppressed, self.roof_restored = True, False
+            if self.middle_ground_platform not in self.platforms:
+                self.platforms.add(self.middle_ground_platform)
+                self.middle_platforms_visible = True
+            self.remove_vertical_platforms()
+        except: pass
+        
+        self.waiting_for_reentry, self.waiting_for_reentry_counter = True, arena['entry']['roof_delay']
+        self.boss_fight_active = True
+        self.boss = Boss(self, *arena['boss']['spawn'], self.boss_config)
+
+    def start_boss_fight(self):
+        """Skips the first room: kills enemy1, opens the well and drops the player into the boss arena."""
+        self.restart()
+        self.enemy1.health, self.enemy1.alive = 0, False
+        self.enemy1_dead()
+        self.enemy1_dead_handled = True
+        self.player.rect.centerx = self.room['exit']['drop_x']
+        self.enter_boss_room()
+
+    def restart(self, full=False):
+        """Respawns the player. After a boss fight, or always with full=True, the first room is rebuilt too
+        (enemy1 back alive, well closed); otherwise dying in the first room keeps enemy1 dead."""
+        # Reset player
+        self.player = self.spawn_player()
+        
+        # If we were in boss fight, reset to original room state
+        if full or self.boss_fight_active or self.boss_env_suppressed:
+            # Reset enemy1 to alive
+            self.enemy1 = self.spawn_enemy1()
+            self.enemy1_dead_handled = False
+            
+            # Restore normal background
+            self.boss_env_suppressed = False
+            self.waiting_for_reentry = False
             
-            for platform in platform_group:
-                screen.blit(platform.image, platform.rect)
+            # Reset platforms to original state
+            try:
+                # Remove vertical platforms if they exist
+                self.remove_vertical_platforms()
+                
+                # Add back middle platforms if they were removed
+                if self.middle_ground_platform not in self.platforms:
+                    self.platforms.add(self.middle_ground_platform)
+                if self.middle_roof_platform not in self.platforms:
+                    self.platforms.add(self.middle_roof_platform)
+                
+                self.middle_platforms_visible = True
+            except:
+                pass
+        
+        self.roof_restored = False
+        self.boss_fight_active = False
+        self.boss = None
+        self.particles.clear()
+        self.projectiles.clear()
+
+    def snapshot(self):
+        """The whole simulation (entities, pools, platform set, flags, RNG streams) as a pickled bytes blob."""
+        boss = self.boss
+        state = {
+            'flags': {k: getattr(self, k) for k in ('tick', 'seed', 'boss_config', 'roof_restored', 'waiting_for_reentry',
+                                                   'waiting_for_reentry_counter', 'middle_platforms_visible',
+                                                   'enemy1_dead_handled', 'boss_env_suppressed', 'boss_fight_active')},
+            'platforms': (self.middle_ground_platform in self.platforms, self.middle_roof_platform in self.platforms,
+                          self.vertical_platforms_active),
+            'player': entity_state(self.player), 'enemy1': entity_state(self.enemy1),
+            'boss': boss and dict(entity_state(boss), clones=[entity_state(c) for c in boss.clones]),
+            'particles': self.particles.get_state(), 'projectiles': self.projectiles.get_state(),
+            'rng': (pack_rng_state(self.ai_rng), pack_rng_state(self.boss_rng)),
+        }
+        return pickle.dumps((SNAPSHOT_VERSION, state), pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, blob):
+        """Puts the world back exactly as it was when snapshot() produced blob; any World can restore any blob.
+
+        Unpickling is limited to snapshot types (SnapshotUnpickler), so an untrusted blob can't run code,
+        but it can still set the world to any state it likes: check peer input at the protocol level.
+        """
+        version, state = load_snapshot(blob)
+        if version != SNAPSHOT_VERSION: raise ValueError(f"snapshot version {version}, expected {SNAPSHOT_VERSION}")
+        for k, v in state['flags'].items(): setattr(self, k, v)
+
+        ground, roof, verticals = state['platforms']
+        for plat, wanted in ((self.middle_ground_platform, ground), (self.middle_roof_platform, roof)):
+            if wanted and plat not in self.platforms: self.platforms.add(plat)
+            elif not wanted and plat in self.platforms: self.platforms.remove(plat)
+        if verticals: self.create_vertical_platforms()
+        else: self.remove_vertical_platforms()
+
+        # Player and enemy keep their (shared) frames; only the state moves, then the current frame is re-picked
+        for entity, saved in ((self.player, state['player']), (self.enemy1, state['enemy1'])):
+            vars(entity).update(saved)
+            entity.image, entity.image_flipped = entity.animation_list[entity.action][entity.frame_index], entity.flipped_list[entity.action][entity.frame_index]
+
+        saved = state['boss']
+        if saved is None: self.boss = None
         else:
-            draw_bg()
-            if not enemy1.alive and not boss_env_suppressed and well_img:
-                draw_well()
-
-        # Update and draw particles
-        particles = [p for p in particles if p.update()]
-        for p in particles:
-            p.draw()
+            boss = self.boss = Boss.__new__(Boss)
+            vars(boss).update(saved, world=self)
+            boss.frame_tables, boss.flash_tables = load_boss_frames(boss.scale)
+            boss.animation_frames = boss.frame_tables[False]
+            boss.image = boss.animation_frames[boss.frame_index]
+            boss.clones = []
+            for clone_state in saved['clones']:
+                clone = BossClone.__new__(BossClone)
+                vars(clone).update(clone_state, world=self)
+                boss.clones.append(clone)
+
+        self.particles.set_state(state['particles'])
+        self.projectiles.set_state(state['projectiles'])
+        ai, boss_rng = state['rng']
+        unpack_rng_state(self.ai_rng, ai)
+        unpack_rng_state(self.boss_rng, boss_rng)
+
+    def background(self):
+        """Static surface behind the sprites: the room, or the arena below its well while the boss environment is up."""
+        arena = self.waiting_for_reentry or self.boss_env_suppressed
+        return self.backgrounds.get(self.room['exit']['room'] if arena else self.room['name'])
+
+    def step(self, controls):
+        """Advances the simulation one frame. Returns False if the player died (the world is already restarted)."""
+        self.tick += 1
+        lap = self.profiler.lap if self.profiler else skip_lap
+        player, enemy1, boss = self.player, self.enemy1, self.boss
+        player.prev_pos, enemy1.prev_pos = player.rect.bottomleft, enemy1.rect.bottomleft
+        if boss: boss.prev_pos = boss.rect.center
+
+        if controls.attack:
+            player.attack(controls)
+
+        self.particles.update()
+        lap('particles')
 
         # Boss fight logic
-        if boss_fight_active and boss and boss.alive:
-            new_projectiles = boss.update(player)
-            boss_projectiles.extend(new_projectiles)
+        if self.boss_fight_active and boss and boss.alive:
+            boss.update(player)
             
             # Update clones
             if boss.clones_active:
-                new_clones = []
-                for clone in boss.clones:
-                    clone_projectiles, still_alive = clone.update(player)
-                    boss_projectiles.extend(clone_projectiles)
-                    if still_alive:
-                        new_clones.append(clone)
-                boss.clones = new_clones
+                boss.clones = [clone for clone in boss.clones if clone.update(player)]
+            lap('boss')
             
-            # Update projectiles
-            new_projectiles = []
-            for proj in boss_projectiles:
-                if proj.update():
-                    # Check collision with player
-                    if player.alive and proj.rect.colliderect(player.rect):
-                        player.take_damage(1)
-                        create_particles(proj.x, proj.y, proj.color, 10)
-                    else:
-                        new_projectiles.append(proj)
-            boss_projectiles = new_projectiles
+            # Update projectiles and check collision with player
+            for x, y, color in self.projectiles.update(player.rect if player.alive else None):
+                player.take_damage(1)
+                self.create_particles(x, y, color, 10)
+            lap('projectiles')
             
             # Check player attack on boss
             if player.attacking and player.attack_rect and boss.alive:
@@ -951,29 +1654,13 @@ while run:
                 for clone in boss.clones[:]:
                     if player.attack_rect.colliderect(clone.rect):
                         boss.clones.remove(clone)
-                        create_particles(clone.x, clone.y, clone.color, 20)
+                        self.create_particles(clone.x, clone.y, clone.color, 20)
                         player.attack_rect = None
                         break
-            
-            # Draw boss
-            boss.draw()
-            
-            # Draw clones
-            if boss.clones_active:
-                for clone in boss.clones:
-                    clone.draw()
-            
-            # Draw projectiles
-            for proj in boss_projectiles:
-                proj.draw()
+            lap('combat')
 
         # Player
         player.update_animation()
-        player.draw()
-
-        if not enemy1.alive and not boss_env_suppressed and well2_img:
-            draw_well_front()
-
         if player.alive:
             if player.attacking:
                 player.update_action(6 if player.attack_type == 'up' else 7 if player.attack_type == 'down' else 5)
@@ -983,76 +1670,272 @@ while run:
                 player.update_action(0)
             elif player.in_air:
                 player.update_action(2 if player.vel_y < 0 else 3)
-            elif moving_left or moving_right:
+            elif controls.left or controls.right:
                 player.update_action(1)
             else:
                 player.update_action(0)
-            player.move(moving_left, moving_right)
+            player.move(controls)
+        lap('player')
 
         # Enemy (only when not in boss fight)
-        if not boss_fight_active:
+        if not self.boss_fight_active:
             if enemy1.alive:
                 enemy1.ai_behavior(player)
-                enemy1.draw()
-                draw_enemy1_health_bar(enemy1)
+                enemy1.update_action(1 if abs(enemy1.speed) > 0 and enemy1.state in ['chase', 'patrol'] else 0)
+                enemy1.update_animation()
             else:
-                if not enemy1_dead_handled:
-                    enemy1_dead()
-                    enemy1_dead_handled = True
+                if not self.enemy1_dead_handled:
+                    self.enemy1_dead()
+                    self.enemy1_dead_handled = True
             
             check_combat(player, enemy1)
-        
-        if vertical_platforms_active:
-            for vp in vertical_platforms:
-                screen.blit(vp.image, getattr(vp, '_visual_rect', vp.rect))
-
-        draw_health_masks(player.current_masks, player.max_masks)
+            lap('enemy')
         
         if not player.alive:
-            restart_game()
+            self.restart()
+            return False
             
-        if waiting_for_reentry:
-            if waiting_for_reentry_counter > 0:
-                waiting_for_reentry_counter -= 1
-            elif player.rect.top >= 0 and not roof_restored:
+        if self.waiting_for_reentry:
+            if self.waiting_for_reentry_counter > 0:
+                self.waiting_for_reentry_counter -= 1
+            elif player.rect.top >= 0 and not self.roof_restored:
                 try:
-                    if middle_roof_platform not in platform_group:
-                        platform_group.add(middle_roof_platform)
-                    roof_restored = True
+                    if self.middle_roof_platform not in self.platforms:
+                        self.platforms.add(self.middle_roof_platform)
+                    self.roof_restored = True
                 except: pass
-                waiting_for_reentry, waiting_for_reentry_counter = False, 0
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            run = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_a: moving_left = True
-            elif event.key == pygame.K_d: moving_right = True
-            elif event.key == pygame.K_LEFTBRACKET:
-                DEBUG_HITBOXES = not DEBUG_HITBOXES
-                print(f"DEBUG_HITBOXES={DEBUG_HITBOXES}")
-            elif event.key == pygame.K_ESCAPE: run = False
-            elif event.key == pygame.K_RIGHTBRACKET:
-                enemy1.health, enemy1.alive = 0, False
-        elif event.type == pygame.KEYUP:
-            if event.key == pygame.K_a: moving_left = False
-            elif event.key == pygame.K_d: moving_right = False
-        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            if game_state == 'menu':
-                game_state = 'playing'
-                restart_game()
-            elif game_state == 'playing':
-                player.attack()
-
-    if DEBUG_HITBOXES and game_state == 'playing':
-        for plat in platform_group:
-            pygame.draw.rect(screen, (255, 0, 0), plat.rect, 2)
-        pygame.draw.rect(screen, (255, 0, 0), player.rect, 2)
-        if enemy1:
-            pygame.draw.rect(screen, (255, 0, 0), enemy1.rect, 2)
-        if boss and boss.alive:
-            pygame.draw.rect(screen, (255, 0, 0), boss.rect, 2)
-
-    pygame.display.update()
-
-pygame.quit()
\ No newline at end of file
+                self.waiting_for_reentry, self.waiting_for_reentry_counter = False, 0
+        return True
+
+    def render(self, surface, renderer=None, hitboxes=False, interp=1.0):
+        """Draws the world. With a DirtyRenderer only the regions it tracks are restored and marked.
+
+        interp (0..1) places moving sprites between the previous and the current step, for renders that
+        fall between two fixed updates.
+        """
+        player, enemy1, boss = self.player, self.enemy1, self.boss
+        mark = renderer.mark if renderer else lambda drawn: None
+        lap = self.profiler.lap if self.profiler else skip_lap
+
+        # Background: full blit, or (dirty-rect mode) only under last frame's sprites
+        background = self.background()
+        if renderer: renderer.restore(surface, background, self.backgrounds.recomposed)
+        else: surface.blit(background, (0, 0))
+        if not enemy1.alive and not self.boss_env_suppressed:
+            mark(draw_well(surface, self.room['well']['back']))
+        lap('background')
+
+        mark(self.particles.draw(surface, interp))
+        lap('particle draw')
+
+        if self.boss_fight_active and boss and boss.alive:
+            mark(boss.draw(surface, interp))
+            if boss.clones_active:
+                for clone in boss.clones:
+                    mark(clone.draw(surface))
+            mark(self.projectiles.draw(surface, interp))
+
+        mark(player.draw(surface, interp))
+
+        if not enemy1.alive and not self.boss_env_suppressed:
+            mark(draw_well_front(surface, self.room['well']['front']))
+
+        if not self.boss_fight_active and enemy1.alive:
+            mark(enemy1.draw(surface, interp))
+            mark(hud.draw_enemy1_health_bar(surface, enemy1))
+        
+        if self.vertical_platforms_active:
+            for vp in self.vertical_platforms:
+                mark(surface.blit(vp.image, getattr(vp, '_visual_rect', vp.rect)))
+        lap('sprites')
+
+        mark(hud.draw_health_masks(surface, player.current_masks, player.max_masks))
+        if self.boss_fight_active and boss and boss.alive:
+            mark(hud.draw_boss_title(surface, boss))
+
+        if hitboxes:
+            for plat in self.platforms:
+                mark(pygame.draw.rect(surface, (255, 0, 0), plat.rect, 2))
+            mark(pygame.draw.rect(surface, (255, 0, 0), player.rect, 2))
+            if enemy1:
+                mark(pygame.draw.rect(surface, (255, 0, 0), enemy1.rect, 2))
+            if boss and boss.alive:
+                mark(pygame.draw.rect(surface, (255, 0, 0), boss.rect, 2))
+        lap('hud')
+
+def main(fps=FPS, seed=None, record=None, replay=None, profile_csv=None):
+    """record: path to save this session's input to. replay: path of a recording to play back instead of the player.
+    profile_csv: start with the profiler on and stream its per-frame timings to this CSV file.
+    """
+    global moving_left, moving_right, DEBUG_HITBOXES, DIRTY_RECTS
+    init_display()
+    world, game_state = World(seed), 'menu'
+    recorder = quicksave = None
+    if replay:
+        seed, inputs = load_recording(replay)
+        world, game_state, replay = World(seed), 'playing', iter(inputs)
+        world.restart()
+    profiler = world.profiler = FrameProfiler(csv_path=profile_csv) if profile_csv else None
+    run, attack_clicked, lag = True, False, 0.0
+    while run:
+        lag += min(clock.tick(fps), MAX_FRAME_MS)
+        if profiler: profiler.mark()
+        
+        if game_state == 'menu':
+            lag = 0.0
+            if main_menu.draw(screen): renderer.invalidate()
+        elif game_state == 'playing':
+            # Run as many fixed steps as the elapsed time covers, then render in between the last two
+            while lag >= STEP_MS:
+                controls = next(replay, None) if replay else poll_controls(attack_clicked)
+                if controls is None:
+                    run = False
+                    break
+                if recorder: recorder.record(controls)
+                world.step(controls)
+                attack_clicked = False
+                lag -= STEP_MS
+            if not DIRTY_RECTS: renderer.invalidate()
+            world.render(screen, renderer, DEBUG_HITBOXES, lag / STEP_MS)
+            if profiler:
+                renderer.mark(profiler.draw(screen))
+                profiler.lap('overlay')
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE):
+                main_menu.invalidate()
+                renderer.invalidate()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_a: moving_left = True
+                elif event.key == pygame.K_d: moving_right = True
+                elif event.key == pygame.K_LEFTBRACKET:
+                    DEBUG_HITBOXES = not DEBUG_HITBOXES
+                    print(f"DEBUG_HITBOXES={DEBUG_HITBOXES}")
+                    print(f"particle sprites: {particle_sprites.stats()}, projectile sprites: {projectile_sprites.stats()}")
+                elif event.key == pygame.K_F1:
+                    DIRTY_RECTS = not DIRTY_RECTS
+                    print(f"DIRTY_RECTS={DIRTY_RECTS}")
+                elif event.key == pygame.K_F5 and game_state == 'playing' and not (recorder or replay):
+                    quicksave = world.snapshot()
+                    print(f"quicksave: {len(quicksave)} bytes at tick {world.tick}")
+                elif event.key == pygame.K_F9 and quicksave and not (recorder or replay):
+                    world.restore(quicksave)
+                    renderer.invalidate()
+                elif event.key == pygame.K_F2:
+                    if profiler: profiler.close()
+                    profiler = world.profiler = None if profiler else FrameProfiler()
+                elif event.key == pygame.K_ESCAPE: run = False
+                elif event.key == pygame.K_RIGHTBRACKET and not (recorder or replay):
+                    world.enemy1.health, world.enemy1.alive = 0, False
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_a: moving_left = False
+                elif event.key == pygame.K_d: moving_right = False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if game_state == 'menu':
+                    game_state = 'playing'
+                    world.restart()
+                    if record: recorder = InputRecorder(record, world.seed)
+                elif game_state == 'playing':
+                    attack_clicked = True
+
+        if profiler: profiler.lap('events')
+        renderer.flush()
+        if profiler:
+            profiler.lap('flip')
+            boss = world.boss
+            profiler.end_frame({'particles': len(world.particles), 'projectiles': world.projectiles.n,
+                                'clones': len(boss.clones) if boss else 0, 'surfaces': surface_allocations()})
+
+    if profiler: profiler.close()
+    if recorder:
+        recorder.close()
+        print(f"recorded {recorder.frames} frames to {record}")
+    pygame.quit()
+
+# ---------- HEADLESS ----------
+def scripted_policy(world, frame):
+    """Chase Enemy1, drop down the well, then stand under the boss jumping and swinging upwards.
+    Only a baseline that keeps a fight going unattended; it rarely beats the boss."""
+    player, boss, enemy1 = world.player, world.boss, world.enemy1
+    if boss and boss.alive: target = boss.rect.centerx
+    elif enemy1.alive: target = enemy1.rect.centerx
+    else: target = world.room['exit']['drop_x']
+    dx = target - player.rect.centerx
+    return Controls(dx < -40, dx > 40, frame % 40 < 25, bool(boss), False, frame % 8 == 0, False)
+
+def run_headless(fights=1, max_frames=60 * 60 * 5, policy=scripted_policy, world=None, seed=None, start='boss'):
+    """Plays fights with no rendering, as fast as the CPU allows. Returns one result dict per fight.
+
+    start='boss' drops straight into the boss arena; start='room' begins in the first room, so Enemy1
+    and the well are played too (boss_health stays None until the boss shows up).
+    """
+    init_display(headless=True)
+    world = world or World(seed)
+    results = []
+    for _ in range(fights):
+        if start == 'room': world.restart(full=True)
+        else: world.start_boss_fight()
+        masks_lost, outcome, boss_health = 0, 'timeout', None
+        for frame in range(max_frames):
+            masks = world.player.current_masks
+            if not world.step(policy(world, frame)):
+                masks_lost += masks
+                outcome = 'loss'
+                break
+            masks_lost += masks - world.player.current_masks
+            if world.boss: boss_health = world.boss.health
+            if world.boss and not world.boss.alive:
+                outcome = 'win'
+                break
+        results.append({'result': outcome, 'frames': frame + 1, 'masks_lost': masks_lost, 'boss_health': boss_health})
+    return results
+
+def run_replay(path):
+    """Plays a recording through a fresh world as fast as possible. Returns (world, deaths, seconds per step)."""
+    init_display(headless=True)
+    seed, inputs = load_recording(path)
+    world, deaths, step_times = World(seed), 0, []
+    world.restart()
+    for controls in inputs:
+        start = time.perf_counter()
+        if not world.step(controls): deaths += 1
+        step_times.append(time.perf_counter() - start)
+    return world, deaths, step_times
+
+# ---------- MAIN LOOP ----------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Poxel Knight')
+    parser.add_argument('--headless', action='store_true', help='simulate boss fights without a window')
+    parser.add_argument('--fights', type=int, default=1, help='number of headless fights to run')
+    parser.add_argument('--start', choices=['boss', 'room'], default='boss',
+                        help='headless fights start in the boss arena, or in the first room against Enemy1')
+    parser.add_argument('--seed', type=int, help='seed for enemy, boss and particle randomness (random if omitted)')
+    parser.add_argument('--record', metavar='PATH', help='save the input of this session to PATH')
+    parser.add_argument('--replay', metavar='PATH', help='play back a recording (with --headless: at full speed, printing step times)')
+    parser.add_argument('--profile-csv', metavar='PATH', help='start with the F2 profiler on and write per-frame timings to PATH')
+    parser.add_argument('--fps', type=int, default=FPS, help='render rate, e.g. 120 or 144; the game still updates at 60 Hz')
+    args = parser.parse_args()
+    init_display(headless=args.headless)
+    if args.headless and args.replay:
+        world, deaths, step_times = run_replay(args.replay)
+        step_times.sort()
+        n = len(step_times)
+        if n:
+            print(f"{n} frames, {deaths} deaths, boss health {world.boss.health if world.boss else None}, seed {world.seed}")
+            print(f"step ms: mean {sum(step_times) / n * 1000:.3f}, p95 {step_times[int(n * 0.95)] * 1000:.3f}, "
+                  f"max {step_times[-1] * 1000:.3f} ({n / sum(step_times):.0f} frames/s)")
+        pygame.quit()
+    elif args.headless:
+        start = time.perf_counter()
+        world = World(args.seed)
+        results = run_headless(args.fights, world=world, start=args.start)
+        elapsed = time.perf_counter() - start
+        for i, r in enumerate(results):
+            print(f"fight {i}: {r['result']} in {r['frames']} frames, masks lost {r['masks_lost']}, boss health {r['boss_health']}")
+        frames = sum(r['frames'] for r in results)
+        print(f"{len(results)} fights, {frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} frames/s), seed {world.seed}")
+        pygame.quit()
+    else:
+        main(args.fps, args.seed, args.record, args.replay, args.profile_csv)